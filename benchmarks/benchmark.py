@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# Benchmark ec2-volume-report against synthetic fleets, without an AWS account.
+#
+# EC2 is replaced by a local stand-in : a botocore 'before-call' hook answers DescribeVolumes from an in-memory fleet,
+# honouring pagination (MaxResults/NextToken) and the server-side filters the report sends, so no request leaves the process.
+#
+# Phases timed separately for each fleet size and argument combination :
+#   scan   : end-to-end cli.get_volumes(), pagination through botocore, filtering, merging and rendering to /dev/null
+#   filter : compile_filters() predicate evaluated over every volume of the fleet
+#   render : RowWriter.row() over every record for each --format
+#   store  : records built for the whole fleet, with the compact VolumeRecord and with the original dict layout (compare the Peak MiB)
+#
+# Usage :
+#   python benchmarks/benchmark.py                              # 1k, 10k and 100k volumes
+#   python benchmarks/benchmark.py --sizes 1000 --save baseline.json
+#   python benchmarks/benchmark.py --sizes 1000 --compare baseline.json
+
+from pprint import pprint as pp
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ec2_volume_report import cli
+from ec2_volume_report.filters import compile_filters
+from ec2_volume_report.output import RowWriter
+from ec2_volume_report.scan import Scanner, make_record
+
+REGIONS = [
+    'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'ca-central-1', 'sa-east-1',
+    'eu-west-1', 'eu-west-2', 'eu-west-3', 'eu-central-1', 'eu-north-1',
+    'ap-south-1', 'ap-northeast-1', 'ap-northeast-2', 'ap-southeast-1', 'ap-southeast-2',
+]
+
+# Representative argument combinations, on top of --region for every fleet region
+SCENARIOS = {
+    'all': [],
+    'owner-contains': ['--owner', 'ali'],
+    'owner-exact': ['--owner-exact', 'alice'],
+    'size-range': ['--range-lower', '20', '--range-upper', '100', '--match', 'all'],
+    'missing-tags': ['--missing', 'owner', '--missing', 'project'],
+    'custom-tag': ['--tag', 'costcentre', '--name', 'db'],
+}
+
+FORMATS = [None, 'tsv', 'csv', 'ndjson']
+
+##################
+# Synthetic fleet
+##################
+def make_fleet(size, seed=1):
+    # Spread SIZE volumes over every region with a realistic mix of tags, spellings and sizes
+    rnd = random.Random(seed)
+    owners = ['alice', 'bob', 'Carol', 'dave', 'erin', 'platform-team', 'data-eng']
+    projects = ['apollo', 'gemini', 'mercury', 'Voyager', 'legacy']
+    fleet = {region: [] for region in REGIONS}
+    created = datetime.datetime(2018, 1, 1, tzinfo=datetime.timezone.utc)
+    for i in range(size):
+        region = REGIONS[i % len(REGIONS)]
+        tags = []
+        if rnd.random() < 0.85:
+            tags.append({'Key': rnd.choice(['Name', 'Name', 'name']), 'Value': rnd.choice(['web', 'db', 'batch', 'cache']) + '-' + str(i)})
+        if rnd.random() < 0.7:
+            tags.append({'Key': rnd.choice(['Owner', 'owner']), 'Value': rnd.choice(owners)})
+        if rnd.random() < 0.6:
+            tags.append({'Key': rnd.choice(['Project', 'project']), 'Value': rnd.choice(projects)})
+        if rnd.random() < 0.4:
+            tags.append({'Key': 'CostCentre', 'Value': 'cc-' + str(rnd.randint(100, 120))})
+        for _ in range(rnd.randint(0, 4)):   # Noise tags added by other tooling
+            tags.append({'Key': 'aws:cloudformation:' + rnd.choice(['stack-name', 'stack-id', 'logical-id']), 'Value': 'stack-' + str(rnd.randint(1, 500))})
+        state = rnd.choice(['available', 'in-use', 'in-use', 'in-use'])
+        volume = {
+            'VolumeId': 'vol-%017x' % (i * 7919 + 1),
+            'AvailabilityZone': region + rnd.choice('abc'),
+            'Size': rnd.choice([8, 8, 20, 30, 50, 100, 200, 500, 1000]),
+            'VolumeType': rnd.choice(['gp2', 'gp2', 'io1', 'st1', 'sc1', 'standard']),
+            'State': state,
+            'CreateTime': created + datetime.timedelta(minutes=37 * i),
+            'Encrypted': rnd.random() < 0.5,
+            'Attachments': [],
+        }
+        if state == 'in-use':
+            volume['Attachments'].append({'InstanceId': 'i-%017x' % rnd.randint(1, size), 'State': 'attached', 'Device': '/dev/xvda',
+                                          'VolumeId': volume['VolumeId'], 'AttachTime': volume['CreateTime'], 'DeleteOnTermination': True})
+        if tags:
+            volume['Tags'] = tags
+        fleet[region].append(volume)
+    return fleet
+
+def dict_record(volume, region, tag_columns=None):
+    # The original record layout : one dict per volume with placeholder strings and the size as text, kept to compare memory against
+    record = {
+        'Region': region,
+        'Zone': volume.get('AvailabilityZone') or 'NO_ZONE',
+        'Volume ID': volume.get('VolumeId') or 'NO_VOL_ID',
+        'Size': str(volume['Size']) if volume.get('Size') else 'SIZE_UND',
+        'Type': volume.get('VolumeType') or 'TYP_UND',
+        'Status': volume.get('State') or 'STATE_UND',
+        'Name': 'NO_NAME',
+        'Owner': 'NO_OWNER',
+        'Project': 'NO_PROJECT',
+        'Created': str(volume['CreateTime']) if volume.get('CreateTime') else 'CREATION_UND',
+        }
+    for tag in volume.get('Tags', []):
+        key = str.lower(tag['Key'])
+        if key in ('name', 'owner', 'project'):
+            record[key.capitalize()] = tag['Value']
+        for custom_tag in tag_columns or []:
+            if key == str.lower(custom_tag):
+                record[custom_tag] = tag['Value']
+    return record
+
+##################
+# Local stand-in
+##################
+def match_filter(volume, aws_filter):
+    values = aws_filter['Values']
+    tags = volume.get('Tags', [])
+    if aws_filter['Name'] == 'volume-id':
+        return volume['VolumeId'] in values
+    if aws_filter['Name'] == 'volume-type':
+        return volume['VolumeType'] in values
+    if aws_filter['Name'] == 'availability-zone':
+        return volume['AvailabilityZone'] in values
+    if aws_filter['Name'] == 'size':
+        return str(volume['Size']) in values
+    if aws_filter['Name'] == 'status':
+        return volume['State'] in values
+    if aws_filter['Name'] == 'tag-key':
+        return any(tag['Key'] in values for tag in tags)
+    if aws_filter['Name'] == 'tag-value':
+        return any(tag['Value'] in values for tag in tags)
+    raise ValueError('filter ' + aws_filter['Name'] + ' is not supported by the stand-in')
+
+class StandIn:
+    # Answer DescribeVolumes from FLEET for every client created from the botocore SESSION
+    def __init__(self, session, fleet):
+        self.fleet = fleet
+        self.calls = 0
+        self.filtered = dict()   # Filtered volume lists cached per (region, filters), pages slice into them
+        self.session = session
+        session.register('before-parameter-build.ec2', self.keep_params)
+        session.register('before-call.ec2', self.answer)
+
+    def close(self):
+        # Stop answering, so the stand-in of the next fleet size is the one serving the calls
+        self.session.unregister('before-parameter-build.ec2', self.keep_params)
+        self.session.unregister('before-call.ec2', self.answer)
+
+    def keep_params(self, params, context, **kwargs):
+        context['standin_params'] = dict(params)
+
+    def answer(self, model, context, **kwargs):
+        params = context.get('standin_params', {})
+        if model.name != 'DescribeVolumes':
+            return None
+        self.calls += 1
+        region = context['client_region']
+        key = (region, json.dumps(params.get('Filters', []), sort_keys=True))
+        if key not in self.filtered:
+            self.filtered[key] = [volume for volume in self.fleet.get(region, []) if all(match_filter(volume, aws_filter) for aws_filter in params.get('Filters', []))]
+        volumes = self.filtered[key]
+        start = int(params.get('NextToken') or 0)
+        end = start + (params.get('MaxResults') or len(volumes) or 1)
+        response = {'Volumes': volumes[start:end], 'ResponseMetadata': {'HTTPStatusCode': 200, 'RetryAttempts': 0}}
+        if end < len(volumes):
+            response['NextToken'] = str(end)
+        return StandInResponse(), response
+
+class StandInResponse:
+    status_code = 200
+    headers = {}
+    content = b''
+
+##################
+# Report loading
+##################
+def load_report(tmpdir):
+    # Prepare the CLI module for direct calls, with a fake profile
+    with open(os.path.join(tmpdir, 'config'), 'w') as config:
+        config.write('[profile script_ec2volumereport]\nregion = us-east-1\n')
+    with open(os.path.join(tmpdir, 'credentials'), 'w') as credentials:
+        credentials.write('[script_ec2volumereport]\naws_access_key_id = AKIABENCHMARK\naws_secret_access_key = benchmark\n')
+    os.environ['AWS_CONFIG_FILE'] = os.path.join(tmpdir, 'config')
+    os.environ['AWS_SHARED_CREDENTIALS_FILE'] = os.path.join(tmpdir, 'credentials')
+    os.environ['AWS_EC2_METADATA_DISABLED'] = 'true'
+
+    import boto3
+    cli.session = boto3.Session(profile_name=cli.DEFAULT_PROFILE)
+    cli.cache = None
+    cli.stats = None
+    return cli
+
+def set_args(report, scenario_args, extra=()):
+    report.args = report.parse_args(scenario_args + list(extra))
+    report.arg_region = list(REGIONS)
+
+##################
+# Measurements
+##################
+def measure(func, memory):
+    # Run FUNC once and return (seconds, peak MiB or None), the peak comes from a second traced run so tracing does not skew the timing
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return seconds, peak
+
+def run(sizes, scenarios, memory):
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report = load_report(tmpdir)
+        for size in sizes:
+            fleet = make_fleet(size)
+            volumes = [volume for region in REGIONS for volume in fleet[region]]
+            standin = StandIn(report.session._session, fleet)
+            report.scanner = Scanner(report.session)   # Fresh clients, they copy the event handlers registered on the session when they are created
+            report.scanners = [report.scanner]
+            # Warm up : create the region clients once, untimed, so the first scenario does not pay for them
+            set_args(report, SCENARIOS[scenarios[0]])
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                report.get_volumes()
+
+            # store : memory held by the records of the whole fleet, per layout
+            for layout, build in (('dict', dict_record), ('record', make_record)):
+                def store():
+                    return [build(volume, region, ['CostCentre']) for region in REGIONS for volume in fleet[region]]
+                seconds, peak = measure(store, memory)
+                results[(size, 'all', 'store-' + layout)] = (seconds, size, peak)
+            for scenario in scenarios:
+                set_args(report, SCENARIOS[scenario])
+
+                # scan : end-to-end get_volumes()
+                def scan():
+                    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                        report.get_volumes()
+                standin.filtered.clear()
+                seconds, peak = measure(scan, memory)
+                matched = len(report.ec2data)
+                results[(size, scenario, 'scan')] = (seconds, size, peak)
+
+                # filter : predicate only, over the whole fleet
+                def evaluate():
+                    volume_filter = compile_filters(report.args)
+                    for volume in volumes:
+                        volume_filter(volume)
+                seconds, peak = measure(evaluate, memory)
+                results[(size, scenario, 'filter')] = (seconds, size, peak)
+
+                # render : every output format over the matched records
+                records = list(report.ec2data.values())
+                for output_format in FORMATS:
+                    set_args(report, SCENARIOS[scenario], ['--format', output_format] if output_format else [])
+
+                    def render():
+                        with open(os.devnull, 'w') as devnull:
+                            writer = RowWriter(report.args.format, report.args.tag, devnull)
+                            if report.args.format:
+                                writer.header()
+                            for record in records:
+                                writer.row(record)
+                    seconds, peak = measure(render, memory)
+                    results[(size, scenario, 'render-' + (output_format or 'default'))] = (seconds, matched, peak)
+                print('.', end='', file=sys.stderr, flush=True)
+            standin.close()
+        print('', file=sys.stderr)
+    return results
+
+def to_json(results):
+    return {'/'.join([str(size), scenario, phase]): {'seconds': seconds, 'volumes': volumes, 'peak_mib': peak}
+            for (size, scenario, phase), (seconds, volumes, peak) in results.items()}
+
+def print_results(results, baseline):
+    print('%-8s %-16s %-16s %10s %14s %10s %10s' % ('Volumes', 'Scenario', 'Phase', 'Seconds', 'Volumes/sec', 'Peak MiB', 'vs base'))
+    for key, result in to_json(results).items():
+        size, scenario, phase = key.split('/')
+        rate = result['volumes'] / result['seconds'] if result['seconds'] else 0
+        peak = '%.1f' % result['peak_mib'] if result['peak_mib'] is not None else '-'
+        change = '-'
+        if baseline and key in baseline and baseline[key]['seconds']:
+            change = '%+.0f%%' % ((result['seconds'] / baseline[key]['seconds'] - 1) * 100)
+        print('%-8s %-16s %-16s %10.3f %14.0f %10s %10s' % (size, scenario, phase, result['seconds'], rate, peak, change))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ec2-volume-report against synthetic fleets.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[1000, 10000, 100000], help="Fleet sizes to generate (default: 1000 10000 100000).")
+    parser.add_argument("--scenario", action='append', choices=sorted(SCENARIOS), help="Only run SCENARIO, accepts multiple values (default: all).")
+    parser.add_argument("--no-memory", action='store_true', help="Skip the traced runs measuring peak memory.")
+    parser.add_argument("--save", help="Save the results as a baseline JSON file.")
+    parser.add_argument("--compare", help="Compare the timings against a baseline JSON file saved with --save.")
+    parser.add_argument("--debug-results", action='store_true', help="Debug, print the raw results.")
+    bench_args = parser.parse_args()
+
+    baseline = None
+    if bench_args.compare:
+        with open(bench_args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = run(bench_args.sizes, bench_args.scenario or list(SCENARIOS), not bench_args.no_memory)
+    print_results(results, baseline)
+    if bench_args.debug_results:
+        pp(to_json(results))
+
+    if bench_args.save:
+        with open(bench_args.save, 'w') as baseline_file:
+            json.dump(to_json(results), baseline_file, indent=2, sort_keys=True)
+        print('Baseline saved to ' + bench_args.save)
+
+if __name__ == '__main__':
+    main()
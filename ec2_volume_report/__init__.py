@@ -0,0 +1,24 @@
+# Report (and optionally delete) EC2 volumes across regions.
+# The scanning API needs boto3, it is imported on first use so importing the package (and running the CLI) stays cheap.
+from .options import OPTION_DEFAULTS, build_options
+
+__all__ = ['OPTION_DEFAULTS', 'build_options', 'iter_volumes', 'make_record', 'VolumeRecord', 'Scanner', 'InventoryCache', 'RunStats', 'RowWriter', 'GroupTotals', 'Watcher', 'delete_volumes']
+
+LAZY_EXPORTS = {
+    'iter_volumes': 'scan',
+    'make_record': 'scan',
+    'Scanner': 'scan',
+    'VolumeRecord': 'records',
+    'InventoryCache': 'cache',
+    'RunStats': 'stats',
+    'RowWriter': 'output',
+    'GroupTotals': 'groups',
+    'Watcher': 'watch',
+    'delete_volumes': 'delete',
+}
+
+def __getattr__(name):
+    if name not in LAZY_EXPORTS:
+        raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+    import importlib
+    return getattr(importlib.import_module('.' + LAZY_EXPORTS[name], __name__), name)
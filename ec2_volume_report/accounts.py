@@ -0,0 +1,58 @@
+# Multi-account scans : one boto3 session per account, from a profile or from a role assumed through STS
+import datetime
+import threading
+
+import boto3
+import botocore.session
+from botocore.credentials import CredentialProvider, RefreshableCredentials
+
+ROLE_SESSION_NAME = 'ec2-volume-report'
+REFRESH_MARGIN = 15 * 60   # Assume the role again when the cached credentials expire within this many seconds (botocore refreshes from 15 minutes)
+
+# Assumed role credentials, reused by every session of the process until they are about to expire
+credentials_cache = dict()   # (base profile, role ARN, STS endpoint) -> assume_role Credentials
+credentials_lock = threading.Lock()
+
+def is_role_arn(entry):
+    return entry.startswith('arn:')
+
+def account_label(entry):
+    # Value of the Account column : the account ID of a role ARN (arn:aws:iam::123456789012:role/Name), or the profile name
+    if is_role_arn(entry):
+        return entry.split(':')[4]
+    return entry
+
+def assume_role(base_session, role_arn, sts_endpoint_url=None):
+    # Return the credentials of ROLE_ARN as botocore credential metadata, from the cache while they are still valid
+    key = (base_session.profile_name, role_arn, sts_endpoint_url)
+    with credentials_lock:
+        credentials = credentials_cache.get(key)
+        if credentials is None or (credentials['Expiration'] - datetime.datetime.now(datetime.timezone.utc)).total_seconds() < REFRESH_MARGIN:
+            sts = base_session.client('sts', region_name=base_session.region_name or 'us-east-1', endpoint_url=sts_endpoint_url)
+            credentials = sts.assume_role(RoleArn=role_arn, RoleSessionName=ROLE_SESSION_NAME)['Credentials']
+            credentials_cache[key] = credentials
+    return {
+        'access_key': credentials['AccessKeyId'],
+        'secret_key': credentials['SecretAccessKey'],
+        'token': credentials['SessionToken'],
+        'expiry_time': credentials['Expiration'].isoformat(),
+    }
+
+class AssumedRoleProvider(CredentialProvider):
+    # Credential provider handing out the assumed role credentials, botocore calls assume_role() again before they expire
+    METHOD = 'ec2-volume-report-assume-role'
+
+    def __init__(self, base_session, role_arn, sts_endpoint_url=None):
+        self.fetch = lambda: assume_role(base_session, role_arn, sts_endpoint_url)
+
+    def load(self):
+        return RefreshableCredentials.create_from_metadata(self.fetch(), self.fetch, self.METHOD)
+
+def account_session(entry, base_session, sts_endpoint_url=None):
+    # Session for an --accounts ENTRY : a role ARN is assumed with the credentials of BASE_SESSION, anything else is a profile name.
+    # The role is only assumed when the first client is created, so a failing account is reported by its scans.
+    if not is_role_arn(entry):
+        return boto3.Session(profile_name=entry)
+    role_session = botocore.session.Session()
+    role_session.get_component('credential_provider').insert_before('env', AssumedRoleProvider(base_session, entry, sts_endpoint_url))
+    return boto3.Session(botocore_session=role_session, region_name=base_session.region_name)
@@ -0,0 +1,139 @@
+# Local inventory cache
+# Snapshots are stored in SQLite keyed by profile + region, with one connection per thread as connections cannot be shared between threads.
+# Volumes keep their full DescribeVolumes dict in 'data', the AWS filter columns are indexed so cached queries are local lookups.
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+
+CACHE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (profile TEXT, region TEXT, kind TEXT, fetched_at REAL, PRIMARY KEY (profile, region, kind));
+CREATE TABLE IF NOT EXISTS volumes (profile TEXT, region TEXT, volume_id TEXT, zone TEXT, size INTEGER, type TEXT, state TEXT, data TEXT, PRIMARY KEY (profile, region, volume_id));
+CREATE INDEX IF NOT EXISTS volumes_zone ON volumes (profile, region, zone);
+CREATE INDEX IF NOT EXISTS volumes_size ON volumes (profile, region, size);
+CREATE INDEX IF NOT EXISTS volumes_type ON volumes (profile, region, type);
+CREATE INDEX IF NOT EXISTS volumes_state ON volumes (profile, region, state);
+CREATE TABLE IF NOT EXISTS tags (profile TEXT, region TEXT, volume_id TEXT, key TEXT, value TEXT);
+CREATE INDEX IF NOT EXISTS tags_key ON tags (profile, region, key);
+CREATE INDEX IF NOT EXISTS tags_value ON tags (profile, region, value);
+CREATE INDEX IF NOT EXISTS tags_volume ON tags (profile, region, volume_id);
+CREATE TABLE IF NOT EXISTS listings (profile TEXT, region TEXT, kind TEXT, name TEXT, state TEXT);
+CREATE INDEX IF NOT EXISTS listings_kind ON listings (profile, region, kind);
+'''
+
+# Map the AWS filter names onto the indexed cache columns
+CACHE_COLUMNS = {
+    'volume-id': 'volume_id',
+    'volume-type': 'type',
+    'availability-zone': 'zone',
+    'size': 'size',
+    'status': 'state',
+}
+
+def cache_encode(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(repr(value) + ' is not JSON serializable')
+
+def cache_decode(data):
+    volume = json.loads(data)
+    if 'CreateTime' in volume:
+        volume['CreateTime'] = datetime.datetime.fromisoformat(volume['CreateTime'])
+    for attachment in volume.get('Attachments', []):
+        if 'AttachTime' in attachment:
+            attachment['AttachTime'] = datetime.datetime.fromisoformat(attachment['AttachTime'])
+    return volume
+
+class InventoryCache:
+    def __init__(self, cache_dir, ttl, refresh=False, offline=False):
+        self.path = os.path.join(cache_dir, 'inventory.sqlite')
+        self.ttl = ttl
+        self.refresh = refresh
+        self.offline = offline
+        self.local = threading.local()
+        os.makedirs(cache_dir, exist_ok=True)
+        # Switch the database to WAL and create the schema once, before the region threads open their connections :
+        # switching the journal mode needs the database to itself, and fails at once rather than waiting when other threads hold it
+        conn = self.connect()
+        conn.execute('PRAGMA journal_mode=WAL')   # Let the region threads read snapshots while another region is being written
+        conn.executescript(CACHE_SCHEMA)
+
+    @classmethod
+    def from_options(cls, opts):
+        # The cache described by the report options, or None when caching is off
+        if not opts.cache:
+            return None
+        return cls(opts.cache_dir, opts.cache_ttl, refresh=opts.refresh, offline=opts.offline)
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self.local.conn = conn
+        return conn
+
+    def fresh(self, profile, region, kind):
+        # Decide whether the cached snapshot can be used instead of calling AWS, offline accepts any snapshot
+        row = self.connect().execute('SELECT fetched_at FROM snapshots WHERE profile = ? AND region = ? AND kind = ?', (profile, region, kind)).fetchone()
+        if row is None:
+            if self.offline:
+                raise LookupError('no cached ' + kind + (' for ' + region if region else '') + ', run once without --offline')
+            return False
+        return self.offline or (not self.refresh and time.time() - row[0] < self.ttl)
+
+    def empty_regions(self, profile):
+        # Regions whose snapshot would be used (see fresh()) and holds no volume at all, so scanning them cannot return anything
+        if self.refresh:
+            return set()
+        fetched_after = 0 if self.offline else time.time() - self.ttl
+        return set(region for (region,) in self.connect().execute(
+            "SELECT region FROM snapshots WHERE profile = ? AND kind = 'volumes' AND fetched_at > ? "
+            "AND NOT EXISTS (SELECT 1 FROM volumes WHERE volumes.profile = snapshots.profile AND volumes.region = snapshots.region)", (profile, fetched_after)))
+
+    def mark(self, profile, region, kind):
+        self.connect().execute('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)', (profile, region, kind, time.time()))
+
+    def store_volumes(self, profile, region, volumes):
+        # Replace the snapshot of a region in one transaction
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM volumes WHERE profile = ? AND region = ?', (profile, region))
+            conn.execute('DELETE FROM tags WHERE profile = ? AND region = ?', (profile, region))
+            conn.executemany('INSERT INTO volumes VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (
+                (profile, region, volume['VolumeId'], volume.get('AvailabilityZone'), volume.get('Size'), volume.get('VolumeType'), volume.get('State'), json.dumps(volume, default=cache_encode))
+                for volume in volumes))
+            conn.executemany('INSERT INTO tags VALUES (?, ?, ?, ?, ?)', (
+                (profile, region, volume['VolumeId'], tag['Key'], tag['Value'])
+                for volume in volumes for tag in volume.get('Tags', [])))
+            self.mark(profile, region, 'volumes')
+
+    def load_volumes(self, profile, region, aws_filters):
+        # Translate the AWS filters into an indexed query against the snapshot of a region
+        where = ['profile = ?', 'region = ?']
+        params = [profile, region]
+        for aws_filter in aws_filters:
+            values = aws_filter['Values']
+            marks = ', '.join('?' * len(values))
+            if aws_filter['Name'] in CACHE_COLUMNS:
+                where.append(CACHE_COLUMNS[aws_filter['Name']] + ' IN (' + marks + ')')
+            elif aws_filter['Name'] in ('tag-key', 'tag-value'):
+                column = 'key' if aws_filter['Name'] == 'tag-key' else 'value'
+                where.append('volume_id IN (SELECT volume_id FROM tags WHERE profile = ? AND region = ? AND ' + column + ' IN (' + marks + '))')
+                params.extend([profile, region])
+            else:
+                raise ValueError('filter ' + aws_filter['Name'] + ' is not supported by the cache')
+            params.extend(int(value) if aws_filter['Name'] == 'size' else value for value in values)
+        for (data,) in self.connect().execute('SELECT data FROM volumes WHERE ' + ' AND '.join(where), params):
+            yield cache_decode(data)
+
+    def store_listing(self, profile, region, kind, items):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM listings WHERE profile = ? AND region = ? AND kind = ?', (profile, region, kind))
+            conn.executemany('INSERT INTO listings VALUES (?, ?, ?, ?, ?)', ((profile, region, kind, name, state) for name, state in items))
+            self.mark(profile, region, kind)
+
+    def load_listing(self, profile, region, kind):
+        return self.connect().execute('SELECT name, state FROM listings WHERE profile = ? AND region = ? AND kind = ? ORDER BY rowid', (profile, region, kind)).fetchall()
@@ -0,0 +1,545 @@
+# Command line interface of ec2-volume-report
+# boto3 is only imported once the arguments have been parsed, so --help and argument errors do not pay for it.
+from pprint import pprint as pp
+import sys
+import csv
+import json
+import time
+import string
+import random
+import atexit
+import argparse
+import contextlib
+
+from .options import STATUS_ARGS, TYPE_ARGS, OPTION_DEFAULTS, validate_options
+from .filters import get_aws_filters, custom_filter_names
+from .cache import InventoryCache
+from .stats import RunStats
+from .groups import GroupTotals, group_columns
+from .records import enrichment_columns
+from .output import bcolors, RowWriter, write_summary, write_groups
+
+# AWS example code ref : https://github.com/awsdocs/aws-doc-sdk-examples/tree/master/python/example_code
+
+# Report should be run using restricted IAM Role.
+# IAM 'ec2report' credentials should be stored as a boto3 profile (example: ~/.aws/credentials)
+DEFAULT_PROFILE = 'script_ec2volumereport'   # Define which profile to connect with
+
+######################
+# Set up the arguments
+######################
+def build_parser():
+    # Make the sript user-friendly by providing some arguments and help options
+    # Search filters
+    parser = argparse.ArgumentParser(description="Retrieve a list of AWS EC2 instances.")
+
+    g_accounts = parser.add_argument_group('ACCOUNTS')
+    g_awsfilters = parser.add_argument_group('AWS SEARCH FILTERS')
+    g_filters = parser.add_argument_group('CUSTOM SEARCH FILTERS')
+    g_display = parser.add_argument_group('DISPLAY OPTIONS')
+    g_action = parser.add_argument_group('ACTIONS')
+    g_perf = parser.add_argument_group('PERFORMANCE')
+    g_cache = parser.add_argument_group('CACHE')
+    g_watch = parser.add_argument_group('WATCH')
+    g_debug = parser.add_argument_group('DEBUG')
+
+    # Accounts and endpoints
+    g_accounts.add_argument("--profile", default=DEFAULT_PROFILE, help="Connect with the boto3 profile PROFILE (default: " + DEFAULT_PROFILE + ").")
+    g_accounts.add_argument("--accounts", action='append', type=lambda value: [entry.strip() for entry in value.split(',') if entry.strip()], help="Scan every account in ACCOUNTS instead of the --profile account, and add an Account column. ACCOUNTS is a comma separated list of role ARNs, assumed through STS with the --profile credentials, or profile names. Accepts multiple values.")
+    g_accounts.add_argument("--ec2-endpoint-url", help="Send the EC2 calls to EC2_ENDPOINT_URL instead of the AWS endpoint, e.g. a local stand-in.")
+    g_accounts.add_argument("--sts-endpoint-url", help="Send the STS AssumeRole calls to STS_ENDPOINT_URL instead of the AWS endpoint, e.g. a local stand-in.")
+
+    # AWS Search filters
+    g_filters.add_argument("-i", "--id", action='append', help="Return only volumes matching ID. Accepts multiple values.")
+    g_filters.add_argument("-r", "--region", action='append', help=" Return only volumes in Region(s) REGION, accepts multiple values.")
+    g_filters.add_argument("-s", "--size", action='append', help=" Return only volumes with exact size SIZE, accepts multiple values.")
+    g_filters.add_argument("-S", "--status", action='append', choices=STATUS_ARGS, help="Return only volumes with status STATE, accepts multiple values.")
+    g_filters.add_argument("-T", "--type", action='append', choices=TYPE_ARGS, help="Return only volumes where type is exactly TYPE, accepts multiple values.")
+    g_filters.add_argument("-z", "--zone", action='append', help="Return only volumes in availability zone ZONE, accepts multiple values.")
+
+    # Custom search filters
+    g_filters.add_argument("-gt", "--greater-than", type=int, help="Return only volumes where size is greater than or equal to GREATER_THAN.")
+    g_filters.add_argument("-lt", "--lower-than", type=int, help="Return only volumes where size is lower than or equal to LOWER_THAN,.")
+    g_filters.add_argument("-m", "--missing", type=str.lower, action='append', help="Return only volumes where tag key MISSING does not exist, accepts multiple values.")
+    g_filters.add_argument("-n", "--name", action='append', help="Return only volumes where 'name' tag value contains NAME, accepts multiple values.")
+    g_filters.add_argument("-ne", "--name-exact", action='append', help="Return only volumes where 'name' tag value matches NAME exactly, accepts multiple values.")
+    g_filters.add_argument("-o", "--owner", action='append', help="Return only volumes where 'owner' tag value contains OWNER, accepts multiple values.")
+    g_filters.add_argument("-oe", "--owner-exact", action='append', help="Return only volumes where 'owner' tag value matches OWNER exactly, accepts multiple values.")
+    g_filters.add_argument("-p", "--project", action='append', help="Return only volumes where 'project' tag value contains PROJECT, accepts multiple values.")
+    g_filters.add_argument("-pe", "--project-exact", action='append', help="Return only volumes where 'project' tag value matches PROJECT exactly, accepts multiple values.")
+    g_filters.add_argument("-rl", "--range-lower", type=int, help="Return only volumes where size is within range RANGE_LOWER and range RANGE_UPPER.")
+    g_filters.add_argument("-ru", "--range-upper", type=int, help="Return only volumes where size is within range RANGE_LOWER and range RANGE_UPPER.")
+    g_filters.add_argument("-t", "--tag", action='append', help="Return only volumes where tag Key contains TAG, accepts multiple values.")
+    g_filters.add_argument("-te", "--tag-exact", action='append', help="Return only volumes where tag Key is exactly TAG, accepts multiple values.")
+    g_filters.add_argument("--unattached-days", type=int, help="Return only volumes unused for at least UNATTACHED_DAYS days : unattached since their creation (EC2 does not record detach times) or attached only to instances stopped that long. Implies --with-attachments.")
+    g_filters.add_argument("--no-snapshot-since", help="Return only volumes without a completed snapshot since NO_SNAPSHOT_SINCE, a date (YYYY-MM-DD, UTC) or an ISO 8601 time. Implies --with-snapshots.")
+    g_filters.add_argument("--match", choices=['any', 'all'], default=OPTION_DEFAULTS['match'], help="How custom search filters are combined: 'any' returns volumes matching at least one filter (default), 'all' returns only volumes matching every filter. Multiple values given to the same filter always match if any one of them does.")
+
+    # Display options (value printed if argument passed)
+    g_display.add_argument("--colour", help="Colorize the output.", action="store_true")
+    g_display.add_argument("--summary", help="Append a summary to the output.", action="store_true")
+    g_display.add_argument("--format", choices=['tsv', 'csv', 'ndjson'], help="Write machine-readable rows with stable columns (the standard columns then one per --tag) and a header row for tsv/csv. The summary goes to stderr.")
+    g_display.add_argument("--group-by", action='append', type=lambda value: [name.strip() for name in value.split(',') if name.strip()], help="Instead of listing the volumes, print the volume count and total GiB per combination of the comma separated GROUP_BY columns : region, zone, type, status, name, owner, project, account (with --accounts) or a --tag. Accepts multiple values. A table by default, rows or JSON lines with --format.")
+    g_display.add_argument("--with-attachments", help="Add the Instance and Instance State columns, from one paginated DescribeInstances pass per region.", action="store_true")
+    g_display.add_argument("--with-snapshots", help="Add the Last Snapshot and Snapshots columns (completed snapshots owned by the account), from one paginated DescribeSnapshots pass per region.", action="store_true")
+    g_display.add_argument("--stream", help="Write each volume as soon as its page arrives instead of waiting for every region, rows are not sorted (implies --format tsv unless set).", action="store_true")
+
+    # Actions to be performed
+    g_action.add_argument("--delete", help="Delete all listed volumes, with --cache the volumes are listed from AWS and not from the cache.", action="store_true")
+    g_action.add_argument("--dry-run", help="Enable a dry-run on actions.", action="store_true")
+    g_action.add_argument("--delete-workers", type=int, default=8, help="Delete up to DELETE_WORKERS volumes at the same time (default: 8).")
+    g_action.add_argument("--delete-rate", type=float, default=5, help="Maximum DeleteVolume calls per second in each region (default: 5).")
+    g_action.add_argument("--delete-retries", type=int, default=5, help="Retry a throttled DeleteVolume call up to DELETE_RETRIES times with exponential backoff (default: 5).")
+    g_action.add_argument("--delete-report", help="Write the per-volume deletion results to DELETE_REPORT as CSV (default: delete-report-<timestamp>.csv).")
+
+    # Performance options
+    g_perf.add_argument("--parallel", type=int, default=OPTION_DEFAULTS['parallel'], help="Scan up to PARALLEL regions at the same time, across all --accounts (default: 8).")
+    g_perf.add_argument("--no-pushdown", action="store_true", help="Evaluate every custom search filter client-side instead of pushing exact tag and size filters down to the EC2 API.")
+    g_perf.add_argument("--region-timeout", type=int, default=OPTION_DEFAULTS['region_timeout'], help="Give up on a region if it has not been scanned within REGION_TIMEOUT seconds (default: 300). The connect and read timeouts and the retries of each call are sized to fit in it.")
+
+    # Local inventory cache
+    g_cache.add_argument("--cache", action="store_true", help="Keep a local snapshot of every scanned region and answer queries from it while it is fresh. Regions are downloaded in full, unfiltered, when the snapshot is refreshed.")
+    g_cache.add_argument("--cache-ttl", type=int, default=OPTION_DEFAULTS['cache_ttl'], help="Seconds a cached snapshot stays fresh (default: 900).")
+    g_cache.add_argument("--cache-dir", default=OPTION_DEFAULTS['cache_dir'], help="Directory holding the cache database (default: ~/.cache/ec2-volume-report).")
+    g_cache.add_argument("--refresh", action="store_true", help="Re-download every queried region and update the cache, implies --cache.")
+    g_cache.add_argument("--offline", action="store_true", help="Answer only from the cache and never call AWS, implies --cache.")
+
+    # Watch mode
+    g_watch.add_argument("--watch", type=int, metavar='INTERVAL', help="Keep running and rescan every INTERVAL seconds, printing only the volumes added, removed or changed (with the changed columns) since the previous scan. The first scan is the baseline and prints nothing. Stop with Ctrl-C.")
+    g_watch.add_argument("--watch-reconcile", type=int, default=3600, help="Seconds between the full scans of --watch (default: 3600). In between, a rescan only lists the volumes created since the previous one, so removals and changes are reported by the next full scan. 0 makes every rescan a full scan.")
+
+    # Debug filters
+    g_debug.add_argument("--debug-args", help="Debug, print all args", action="store_true")
+    g_debug.add_argument("--debug-filters", help="Debug, print all filters", action="store_true")
+    g_debug.add_argument("--debug-dict", help="Debug, print the ec2data dictionary", action="store_true")
+    g_debug.add_argument("-R", "--region-print", action='store_true', help="Print the names of the regions enabled for the account.")
+    g_debug.add_argument("-Z", "--zone-print", action='store_true', help="Print all availablity zones and status, the regions are queried concurrently.")
+    g_debug.add_argument("--stats", action='store_true', help="Print timings and API statistics per phase and per region to stderr at the end of the run.")
+    g_debug.add_argument("--stats-json", help="Write the --stats data as JSON to STATS_JSON ('-' for stderr). The table is only printed with --stats as well.")
+    g_debug.add_argument("--profile-out", help="Write a cProfile dump of the run to PROFILE_OUT, readable with pstats or snakeviz.")
+
+    return parser
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # Validate the options up front rather than once per volume during the scan
+    try:
+        validate_options(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.stream and not args.format:
+        args.format = 'tsv'
+    if args.accounts:
+        args.accounts = list(dict.fromkeys(entry for entries in args.accounts for entry in entries))
+    if args.group_by is not None:
+        try:
+            args.group_by = group_columns([name for names in args.group_by for name in names], args.tag, bool(args.accounts))
+        except ValueError as e:
+            parser.error(str(e))
+        if not args.group_by:
+            parser.error("--group-by requires at least one column.")
+    if args.watch is not None:
+        if args.watch < 1:
+            parser.error("--watch must be at least 1.")
+        if args.watch_reconcile < 0:
+            parser.error("--watch-reconcile must not be negative.")
+        if args.offline:
+            parser.error("--watch needs AWS and cannot be used with --offline.")
+        if args.delete or args.group_by or args.stream or args.summary or args.debug_dict:
+            parser.error("--watch cannot be used with --delete, --group-by, --stream, --summary or --debug-dict.")
+    if args.delete:
+        # Deletions are decided on the current state of the volumes, never on a cached snapshot
+        if args.offline:
+            parser.error("--delete needs AWS and cannot be used with --offline.")
+        if args.cache:
+            args.refresh = True
+    if args.delete_workers < 1:
+        parser.error("--delete-workers must be at least 1.")
+    if args.delete_rate <= 0:
+        parser.error("--delete-rate must be greater than 0.")
+    if args.delete_retries < 0:
+        parser.error("--delete-retries must not be negative.")
+    return args
+
+def timed(name):
+    # Add the time spent in the block to the --stats phase NAME
+    return stats.timed(name) if stats else contextlib.nullcontext()
+
+def print_stats():
+    data = stats.as_dict()
+    if args.stats_json:
+        if args.stats_json == '-':
+            print(json.dumps(data, indent=2), file=sys.stderr)
+        else:
+            with open(args.stats_json, 'w') as stats_file:
+                json.dump(data, stats_file, indent=2)
+    if args.stats:
+        print('------------------', file=sys.stderr)
+        print('RUN STATISTICS', file=sys.stderr)
+        print('------------------', file=sys.stderr)
+        for name, seconds in data['phases'].items():
+            print('%-16s %9.3fs' % (name, seconds), file=sys.stderr)
+        print('------------------', file=sys.stderr)
+        width = max([16] + [len(region) for region in data['regions']])   # Multi-account runs are keyed account/region
+        print('%-*s %9s %9s %7s %9s %9s %12s %8s %9s' % (width, 'Region', 'Seconds', 'Calls', 'Pages', 'Fetched', 'Matched', 'Bytes', 'Retries', 'Throttles'), file=sys.stderr)
+        for region, entry in data['regions'].items():
+            print('%-*s %9.3f %9d %7d %9d %9d %12d %8d %9d' % ((width, region) + tuple(entry[field] for field in RunStats.REGION_FIELDS)), file=sys.stderr)
+
+##############################
+# Define the various functions
+##############################
+def get_region():
+    global region_list
+    # Obtain the regions enabled for this account, served from the cache when enabled
+    try:
+        region_list = scanner.get_regions(cache)
+    except Exception as e:   # Nothing cached offline, or DescribeRegions failed
+        sys.exit('ERROR : ' + scanner.label(str(e)))
+    return region_list
+
+def get_arg_region():
+    global arg_region
+    # The --region list, or the regions enabled for this account when --region is not set. Listed on first use only.
+    if arg_region is None:
+        if args.region:
+            arg_region = args.region
+        elif region_list is not None:   # Already listed by -R
+            arg_region = region_list
+        else:
+            arg_region = get_region()
+    return arg_region
+
+def get_account_regions():
+    # The regions to scan in each account. With --accounts every account lists the regions it has enabled itself (the cache is keyed by account),
+    # intersected with --region when given, so a region is neither missed nor scanned because of the opt-in status of another account.
+    if not args.accounts:
+        return {scanner: get_arg_region()}
+    import concurrent.futures
+
+    def enabled_regions(account_scanner):
+        try:
+            return account_scanner.get_regions(cache)
+        except Exception as e:
+            return e
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        listings = list(executor.map(enabled_regions, scanners))
+    account_regions = dict()
+    for account_scanner, regions in zip(scanners, listings):
+        if isinstance(regions, Exception):
+            sys.exit('ERROR : ' + account_scanner.label(str(regions)))
+        if args.region:
+            regions = [region for region in args.region if str.lower(region) in set(regions)]
+        account_regions[account_scanner] = regions
+    return account_regions
+
+def get_zone():
+    global zone_list
+    import concurrent.futures
+
+    def describe_zones(region):
+        # Zones of one region, or the error, so one failing region does not stop the listing
+        try:
+            return scanner.describe_zones(str.lower(region), cache)
+        except Exception as e:
+            return e
+
+    # Query the regions concurrently, the results are printed in region order
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        results = executor.map(describe_zones, get_arg_region())
+        print('--------------------')
+        for region, zone_list in zip(arg_region, results):
+            print_zones(region, zone_list)
+
+def print_zones(region, zone_list):
+    print('REGION : ' + region)
+    print('--------------------')
+    if isinstance(zone_list, Exception):
+        print('ERROR : ' + region + ' : ' + str(zone_list), file=sys.stderr)
+        zone_list = []
+    for zone in zone_list:
+        if zone['State'] == 'available':
+            if args.colour:
+                print(zone['ZoneName'] + " : " + bcolors.OKGREEN + zone['State'] + bcolors.ENDC)
+            else:
+                print(zone['ZoneName'] + " : " + zone['State'])
+        else:
+            if args.colour:
+                print(zone['ZoneName'] + " : " + bcolors.FAIL + zone['State'] + bcolors.ENDC)
+            else:
+                print(zone['ZoneName'] + " : " + zone['State'])
+    print('--------------------')
+
+def get_volumes():
+    global ec2data
+    from .scan import scan_targets
+    ec2data = dict()   # Declare dict to be used for storing instance details later
+    output = not args.debug_dict
+    writer = RowWriter(args.format, args.tag, accounts=bool(args.accounts), extra_columns=enrichment_columns(args.with_attachments, args.with_snapshots))
+    # The account x region matrix, scanned by one bounded pool. Regions whose cached snapshot holds no volume are skipped while it is fresh.
+    empty = {account_scanner: cache.empty_regions(account_scanner.profile) if cache else set() for account_scanner in scanners}
+    with timed('get_region'):
+        account_regions = get_account_regions()
+    targets = [(account_scanner, region) for account_scanner in scanners for region in account_regions[account_scanner] if str.lower(region) not in empty[account_scanner]]
+    groups = GroupTotals(args.group_by) if args.group_by else None   # --group-by prints the totals instead of the volumes
+    total = 0
+
+    if args.stream:
+        # Write every row as soon as its page arrives, only keep the records when they are needed afterwards
+        keep = args.delete or args.debug_dict
+        if output and not groups:
+            writer.header()
+        for _, region, records in scan_targets(targets, args, cache):
+            with timed('output'):
+                for record in records or ():
+                    total += 1
+                    if groups:
+                        groups.add(record)
+                    elif output:
+                        writer.row(record)
+                    if keep:
+                        ec2data[record.volume_id] = record
+                sys.stdout.flush()
+    else:
+        keep = not groups or args.delete or args.debug_dict   # Grouped reports do not need the records themselves
+        region_data = dict()
+        partial = dict()
+        partial_groups = dict()
+        for account_scanner, region, records in scan_targets(targets, args, cache):
+            key = (account_scanner.account or '', region)
+            if records is None:
+                region_data[key] = partial.pop(key, {})
+                if groups and key in partial_groups:
+                    groups.merge(partial_groups.pop(key))
+            else:
+                if keep:
+                    partial.setdefault(key, {}).update((record.volume_id, record) for record in records)
+                if groups:
+                    # Totals are added up per region as the pages arrive, and only counted once the region is complete
+                    partial_groups.setdefault(key, GroupTotals(args.group_by)).update(records)
+
+        # Merge in a deterministic order (account, region, then volume ID) regardless of which region finished first
+        for key in sorted(region_data):
+            for vol_id in sorted(region_data[key]):
+                ec2data[vol_id] = region_data[key][vol_id]
+        total = groups.volumes if groups else len(ec2data)
+
+        # Print results line by line
+        if output and not groups:
+            with timed('output'):
+                if args.format:
+                    writer.header()
+                for vol in ec2data:
+                    writer.row(ec2data[vol])
+
+    if output and groups:
+        with timed('output'):
+            write_groups(groups, args.format)
+
+    if args.summary:
+        write_summary(total, args.format)
+
+def watch_volumes():
+    # Rescan every --watch seconds and print the volumes added, removed or changed, until interrupted
+    from .watch import Watcher
+    writer = RowWriter(args.format, args.tag, accounts=bool(args.accounts), extra_columns=enrichment_columns(args.with_attachments, args.with_snapshots))
+    with timed('get_region'):
+        account_regions = get_account_regions()
+    targets = [(account_scanner, region) for account_scanner in scanners for region in account_regions[account_scanner]]
+    if cache:
+        cache.refresh = True   # Full scans re-download the regions, a cached snapshot could be older than the previous rescan
+    watcher = Watcher(targets, args, cache, reconcile=args.watch_reconcile)
+    writer.event_header()
+    sys.stdout.flush()
+    while True:
+        started = time.monotonic()
+        with timed('watch'):
+            for event, record, changes in watcher.check():
+                writer.event(event, record, changes)
+        sys.stdout.flush()
+        time.sleep(max(0, args.watch - (time.monotonic() - started)))
+
+def delete_volumes():
+    passphrase = ''.join(random.choice(string.ascii_uppercase + string.ascii_lowercase + string.digits) for _ in range(4))
+    print("\n")
+    print(bcolors.WARNING + "!! WARNING : THIS IS NOT REVERSABLE !!" + bcolors.ENDC)
+    print("Please enter the following passphrase to DELETE ALL LISTED VOLUMES : " + passphrase)
+    print(bcolors.WARNING + "!! WARNING : THIS IS NOT REVERSABLE !!" + bcolors.ENDC)
+    print("\n")
+    answer = ''
+    while answer != passphrase:
+        answer = input("Passphrase: ").strip()
+
+    with timed('delete_volumes'):
+        run_deletes()
+
+def run_deletes():
+    from . import delete
+
+    def print_result(vol, result, attempts, detail):
+        where = ec2data[vol].account + ' : ' + ec2data[vol].region if args.accounts else ec2data[vol].region
+        line = vol + ' : ' + where + ' : ' + result + (' : ' + detail if detail else '')
+        if args.colour and result == 'failed':
+            line = bcolors.FAIL + line + bcolors.ENDC
+        print(line)
+
+    results = delete.delete_volumes(ec2data, {account_scanner.account: account_scanner for account_scanner in scanners}, dry_run=args.dry_run, workers=args.delete_workers,
+                                    rate=args.delete_rate, retries=args.delete_retries, stats=stats, on_result=print_result)
+
+    # Per-volume results file, in listing order
+    report_path = args.delete_report or 'delete-report-' + time.strftime('%Y%m%d-%H%M%S') + '.csv'
+    with open(report_path, 'w', newline='') as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow((['Account'] if args.accounts else []) + ['Volume ID', 'Region', 'Result', 'Attempts', 'Detail'])
+        for vol in ec2data:
+            writer.writerow(([ec2data[vol].account] if args.accounts else []) + [vol, ec2data[vol].region] + list(results[vol]))
+
+    succeeded = sum(1 for result, _, _ in results.values() if result in ('deleted', 'dry-run'))
+    failed = sum(1 for result, _, _ in results.values() if result == 'failed')
+    skipped = sum(1 for result, _, _ in results.values() if result == 'skipped')
+    print('------------------')
+    print('Succeeded : ' + str(succeeded) + (' (dry-run)' if args.dry_run else ''))
+    print('Failed    : ' + str(failed))
+    print('Skipped   : ' + str(skipped))
+    print('Results   : ' + report_path)
+    print('------------------')
+
+def print_filters():
+    filters, pushed_filters = get_aws_filters(args)
+    # Print the list of filters and values
+    if args.region:
+        print('-----------------')
+        print('FILTERED REGIONS')
+        print('-----------------')
+        for region in args.region:
+            print(str.lower(region))
+        print("\n")
+    print("-----------")
+    print("FILTER LIST")
+    print("-----------")
+    print(filters)    # Print the full currently assigned filters dict
+
+    print("\n-------------")
+    print("FILTER KEYS")
+    print("-------------")
+    for value in filters.keys():    # Print each currently defined filter key
+        print(value)
+
+    print("\n-------------")
+    print("FILTER VALUES")
+    print("-------------")
+    for value in filters.values():    # Print each currently defined filter value
+        pp(value)
+
+    print("\n-------------------")
+    print("SERVER-SIDE FILTERS")
+    print("-------------------")
+    for value in filters.values():    # Print each filter sent to the EC2 API
+        print(value['Name'] + ' : ' + ', '.join(value['Values']))
+
+    print("\n-------------------")
+    print("CLIENT-SIDE FILTERS")
+    print("-------------------")
+    print('match : ' + args.match)
+    for name in custom_filter_names(args):    # Print each custom filter checked after download
+        if name in pushed_filters:
+            print('--' + name.replace('_', '-') + ' : narrowed server-side, re-checked client-side')
+        else:
+            print('--' + name.replace('_', '-') + ' : client-side only')
+
+##############
+# Do the stuff
+##############
+def main(argv=None):
+    global args, stats, scanner, scanners, cache, arg_region, region_list
+    args = parse_args(argv)
+
+    if args.profile_out:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        atexit.register(lambda: (profiler.disable(), profiler.dump_stats(args.profile_out)))
+
+    # Collect run statistics through botocore event hooks, only when asked for
+    stats = RunStats() if args.stats or args.stats_json else None
+
+    import boto3
+    from .scan import Scanner, POOL_CONNECTIONS
+    session = boto3.Session(profile_name=args.profile)   # Create a boto3 session using the defined profile
+    pool_connections = max(POOL_CONNECTIONS, args.delete_workers)   # The delete workers share the client of each region
+    scanner = Scanner(session, region_timeout=args.region_timeout, stats=stats, endpoint_url=args.ec2_endpoint_url, pool_connections=pool_connections)
+    scanners = [scanner]
+    if args.accounts:
+        # One session per account, the roles are assumed with the --profile credentials
+        from .accounts import account_session, account_label
+        scanners = [Scanner(account_session(entry, session, args.sts_endpoint_url), region_timeout=args.region_timeout, stats=stats,
+                            account=account_label(entry), endpoint_url=args.ec2_endpoint_url, pool_connections=pool_connections) for entry in args.accounts]
+    cache = InventoryCache.from_options(args)
+
+    volume_print = True
+
+    ## CONFIRM THE CURRENT VALUES OF EACH ARGUMENT FOR TESTING
+    if args.debug_args:
+        pp(args)
+        print("\n")
+
+    # The regions are only listed from AWS when a scan, -R or -Z needs them, see get_arg_region()
+    region_list = None
+    arg_region = None
+
+    # Print print all available regions if -R flag is set
+    if args.region_print:
+        with timed('get_region'):
+            get_region()
+        print('------------------')
+        print('Available regions:')
+        print('------------------')
+        for region in region_list:
+            print(region)
+        print('------------------')
+        print('Retrieved from AWS')
+        print('------------------')
+        volume_print = False
+
+    if args.debug_filters:
+        print_filters()
+        volume_print = False
+
+    if args.debug_dict:
+        with timed('get_volumes'):
+            get_volumes()
+        print("------------------")
+        print("EC2DATA DICTIONARY")
+        print("------------------")
+        pp({vol: dict(record) for vol, record in ec2data.items()})   # Rendered, as the report prints them
+        for i_id, i_v in ec2data.items():
+            print("-------------------")
+            print(i_id)
+            print("-------------------")
+            for title, attribute in i_v.items():
+                print(title, attribute, sep=" : ")
+
+    if args.zone_print:
+        with timed('get_zone'):
+            get_zone()
+        volume_print = False
+
+    if volume_print and args.watch:
+        try:
+            watch_volumes()
+        except KeyboardInterrupt:
+            pass
+        volume_print = False
+
+    if volume_print:
+        # Go ahead and output the instance details if not checking for a list of regions
+        with timed('get_volumes'):   # Includes the 'output' phase
+            get_volumes()
+
+    if args.delete:
+        delete_volumes()
+
+    if stats:
+        print_stats()
@@ -0,0 +1,80 @@
+# Bulk deletion : volumes are deleted concurrently, rate limited per region, and throttled calls are retried with backoff
+import time
+import random
+import threading
+import concurrent.futures
+
+from botocore.exceptions import ClientError
+
+from .stats import THROTTLE_CODES
+
+DELETE_BACKOFF_BASE = 0.5   # Seconds before the first retry of a throttled delete, doubled on every attempt
+DELETE_BACKOFF_CAP = 20   # Longest single backoff in seconds
+
+# Rate limiter shared by the threads calling the same region
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Block until a token is available
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def delete_volumes(records, scanners, dry_run=False, workers=8, rate=5, retries=5, stats=None, on_result=None):
+    # Delete the volumes of RECORDS (volume ID -> record) and return {volume ID: (result, attempts, detail)}.
+    # SCANNERS maps the account of the records to the Scanner that listed them, records without an account use scanners[None].
+    # Only 'available' volumes are deleted, ON_RESULT(vol, result, attempts, detail) is called as each one completes.
+    # One rate limit per account and region. The region clients come from the scanner pool, without botocore retries so throttling is handled by the backoff below
+    targets = sorted(set((records[vol].account, records[vol].region) for vol in records), key=str)
+    clients = {(account, region): scanners[account].client(region, attempts=1) for account, region in targets}
+    buckets = {target: TokenBucket(rate) for target in targets}
+
+    def delete_volume(vol):
+        # Delete a single volume, returns (result, attempts, detail)
+        record = records[vol]
+        if record.status != 'available':
+            return 'skipped', 0, 'volume is ' + record['Status']
+        account, region = target = record.account, record.region
+        for attempt in range(1, retries + 2):
+            buckets[target].acquire()
+            try:
+                clients[target].delete_volume(
+                    VolumeId=vol,
+                    DryRun=dry_run
+                )
+                return 'deleted', attempt, ''
+            except ClientError as e:
+                code = e.response['Error']['Code']
+                if code == 'DryRunOperation':
+                    return 'dry-run', attempt, e.response['Error'].get('Message', '')
+                if code in THROTTLE_CODES and attempt <= retries:
+                    if stats:
+                        stats.add(region, account, retries=1)
+                    time.sleep(min(DELETE_BACKOFF_CAP, DELETE_BACKOFF_BASE * 2 ** (attempt - 1)) * random.uniform(0.5, 1))
+                    continue
+                return 'failed', attempt, code + ' : ' + e.response['Error'].get('Message', '')
+            except Exception as e:
+                return 'failed', attempt, str(e)
+
+    results = dict()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(delete_volume, vol): vol for vol in records}
+        for future in concurrent.futures.as_completed(futures):
+            vol = futures[future]
+            results[vol] = future.result()
+            if on_result:
+                on_result(vol, *results[vol])
+    return results
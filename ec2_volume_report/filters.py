@@ -0,0 +1,166 @@
+# AWS API filters and the client-side custom search filters
+import datetime
+
+from .options import STATUS_ARGS
+
+MAX_FILTER_VALUES = 200   # Largest list of values pushed down to the API for a single filter
+
+def get_aws_filters(opts): # Filter volume results by AWS API_Filter attributes that are not Tags and do not require fuzzy searching (tag filtering should be case-insensitive)
+    # Returns the filters keyed by a short name, and the names of the custom filters pushed down to the API
+    filters = {}
+
+    # Filter for Volume ID if provided
+    if opts.id:
+        filters["volume_id"] = {
+            'Name': 'volume-id',
+            'Values': opts.id
+        }
+
+    # Filter for volume type if provided
+    if opts.type:
+        filters["type"] = {
+            'Name': 'volume-type',
+            'Values': opts.type
+        }
+
+    # Filter for zones if provided
+    if opts.zone:
+        filters["zone"] = {
+            'Name': 'availability-zone',
+            'Values': opts.zone
+        }
+
+    # Filter for specific volume size if provided
+    if opts.size:
+        filters["size"] = {
+            'Name': 'size',
+            'Values': [str(size) for size in opts.size]
+        }
+
+    # Filter for volume status (default to all)
+    filters["status"] = {
+        'Name': 'status',
+        'Values': opts.status or STATUS_ARGS
+    }
+
+    # Push the custom search filters that AWS can evaluate down to the API so fewer volumes are downloaded.
+    # AWS ANDs every filter together, so this is only possible when the custom filters are ANDed too (--match all) or only one is in use.
+    # The pushed filters only narrow the download, compile_filters() still checks every volume client-side.
+    pushed_filters = []
+    if not opts.no_pushdown and (opts.match == 'all' or len(custom_filter_names(opts)) == 1):
+        # Exact tag values : only tag-value is pushed, the tag key is matched in any case client-side and a tag-key filter
+        # could only list a few spellings of it. The filter can only be used once.
+        for key, values in (('name', opts.name_exact), ('owner', opts.owner_exact), ('project', opts.project_exact)):
+            if values and 'tag_value' not in filters:
+                filters["tag_value"] = {
+                    'Name': 'tag-value',
+                    'Values': values
+                }
+                pushed_filters.append(key + '_exact')
+        # Exact tag keys
+        if opts.tag_exact and 'tag_key' not in filters:
+            filters["tag_key"] = {
+                'Name': 'tag-key',
+                'Values': opts.tag_exact
+            }
+            pushed_filters.append('tag_exact')
+        # Bounded size filters : expanded to the list of exact sizes when the list is short enough
+        for name, lower, upper in (('lower_than', 1, opts.lower_than), ('range_lower', opts.range_lower, opts.range_upper)):
+            if upper is None or upper - lower >= MAX_FILTER_VALUES:
+                continue
+            sizes = [str(size) for size in range(max(lower, 1), upper + 1)]
+            if 'size' in filters:
+                sizes = [size for size in sizes if size in filters['size']['Values']]
+            if not sizes:
+                continue
+            filters["size"] = {
+                'Name': 'size',
+                'Values': sizes
+            }
+            pushed_filters.append(name)
+
+    return filters, pushed_filters
+
+def custom_filter_names(opts):
+    # Names of the custom search filters in use, these are evaluated client-side by compile_filters()
+    return [name for name in ('name', 'name_exact', 'owner', 'owner_exact', 'project', 'project_exact', 'tag', 'tag_exact', 'lower_than', 'greater_than', 'range_lower', 'missing', 'unattached_days', 'no_snapshot_since') if getattr(opts, name) is not None]
+
+def index_tags(volume):
+    # Index the volume tags once by lowercased key : {'name': [('Name', 'web01')], ...}
+    tags = dict()
+    for tag in volume.get('Tags', []):
+        tags.setdefault(str.lower(tag['Key']), []).append((tag['Key'], tag['Value']))
+    return tags
+
+def idle_since(volume):
+    # Start of the time a volume has not been used, None when it is in use or unknown.
+    # Attached volumes are idle when every instance they are attached to is stopped, since the last of them stopped.
+    # EC2 does not record when a volume was detached, so an unattached volume counts from its creation time.
+    instances = volume.get('Instances')
+    if not volume.get('Attachments'):
+        return volume.get('CreateTime')
+    if not instances or any(instance['StoppedAt'] is None for instance in instances):
+        return None
+    return max(instance['StoppedAt'] for instance in instances)
+
+def compile_filters(opts): # Compile the custom search filters into a single predicate, called once before scanning
+    # Each active filter becomes one check, values given to the same filter are OR'd together.
+    # With --match any (default) a volume is kept if at least one check passes, with --match all every check must pass.
+    # Without any custom search filter every volume is kept.
+    checks = []
+
+    def tag_contains(key, values):
+        needles = [str.lower(value) for value in values]
+        return lambda volume, tags: any(needle in str.lower(tag_value) for _, tag_value in tags.get(key, ()) for needle in needles)
+
+    def tag_exact(key, values):
+        wanted = set(values)
+        return lambda volume, tags: any(tag_value in wanted for _, tag_value in tags.get(key, ()))
+
+    # --name, --owner, --project : Tag called 'name'/'owner'/'project' (any case) with value CONTAINING the argument (case-insensitive)
+    # --name-exact, --owner-exact, --project-exact : Tag called 'name'/'owner'/'project' (any case) with value EXACTLY the argument
+    for key, contains, exact in (('name', opts.name, opts.name_exact), ('owner', opts.owner, opts.owner_exact), ('project', opts.project, opts.project_exact)):
+        if contains:
+            checks.append(tag_contains(key, contains))
+        if exact:
+            checks.append(tag_exact(key, exact))
+    # --tag : Tag with key CONTAINING TAG (case-insensitive)
+    if opts.tag:
+        needles = [str.lower(custom_tag) for custom_tag in opts.tag]
+        checks.append(lambda volume, tags: any(needle in key for key in tags for needle in needles))
+    # --tag-exact : Tag with key EXACTLY TAG
+    if opts.tag_exact:
+        wanted = set(opts.tag_exact)
+        checks.append(lambda volume, tags: any(key in wanted for entries in tags.values() for key, _ in entries))
+    # --lower-than, --greater-than, --range-lower/--range-upper : size bounds, inclusive
+    if opts.lower_than is not None:
+        checks.append(lambda volume, tags: volume['Size'] <= opts.lower_than)
+    if opts.greater_than is not None:
+        checks.append(lambda volume, tags: volume['Size'] >= opts.greater_than)
+    if opts.range_lower is not None:
+        checks.append(lambda volume, tags: opts.range_lower <= volume['Size'] <= opts.range_upper)
+    # --missing : tagged volumes where none of the tag keys MISSING exist
+    if opts.missing:
+        checks.append(lambda volume, tags: bool(tags) and all(missing not in tags for missing in opts.missing))
+    # --unattached-days : volumes idle for at least N days, see idle_since()
+    if opts.unattached_days is not None:
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=opts.unattached_days)
+
+        def unattached(volume, tags):
+            since = idle_since(volume)
+            return since is not None and since <= cutoff
+        checks.append(unattached)
+    # --no-snapshot-since : volumes without a completed snapshot started on or after the time given
+    if opts.no_snapshot_since is not None:
+        checks.append(lambda volume, tags: volume.get('LastSnapshotTime') is None or volume['LastSnapshotTime'] < opts.no_snapshot_since)
+
+    if not checks:
+        return lambda volume: True
+
+    combine = all if opts.match == 'all' else any
+
+    def volume_filter(volume):
+        tags = index_tags(volume)
+        return combine(check(volume, tags) for check in checks)
+
+    return volume_filter
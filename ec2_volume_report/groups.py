@@ -0,0 +1,58 @@
+# Group-by aggregation : volume count and total GiB per combination of record columns, added up as the records stream in
+from .records import BASE_COLUMNS
+
+# Columns that can be grouped on, by their lower-case --group-by name. Any --tag column can be grouped on too.
+GROUP_COLUMNS = {column.lower(): column for column in ['Account'] + BASE_COLUMNS if column not in ('Volume ID', 'Size', 'Created')}
+
+def group_columns(names, tag_columns=None, accounts=False):
+    # Resolve the --group-by NAMES (case-insensitive) to record columns, raises ValueError for a name that is not a column
+    tags = {str.lower(custom_tag): custom_tag for custom_tag in tag_columns or []}
+    columns = []
+    for name in names:
+        column = GROUP_COLUMNS.get(str.lower(name)) or tags.get(str.lower(name))
+        if column is None or (column == 'Account' and not accounts):
+            raise ValueError("--group-by " + name + " is not one of " + ', '.join(sorted(set(GROUP_COLUMNS) - ({'account'} if not accounts else set()))) + " or a --tag.")
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+class GroupTotals:
+    # Running totals keyed by the values of COLUMNS, a volume without the tag of a custom column is counted under NO_<TAG>
+    def __init__(self, columns):
+        self.columns = columns
+        self.groups = dict()   # (value, ...) -> [volumes, GiB]
+
+    def key(self, record):
+        values = []
+        for column in self.columns:
+            try:
+                values.append(record[column])
+            except KeyError:
+                values.append('NO_' + str.upper(column))
+        return tuple(values)
+
+    def add(self, record):
+        key = self.key(record)
+        entry = self.groups.get(key)
+        if entry is None:
+            entry = self.groups[key] = [0, 0]
+        entry[0] += 1
+        entry[1] += record.size or 0
+
+    def update(self, records):
+        for record in records:
+            self.add(record)
+
+    def merge(self, other):
+        for key, (volumes, gib) in other.groups.items():
+            entry = self.groups.setdefault(key, [0, 0])
+            entry[0] += volumes
+            entry[1] += gib
+
+    @property
+    def volumes(self):
+        return sum(volumes for volumes, _ in self.groups.values())
+
+    def rows(self):
+        # One (value, ..., volumes, GiB) row per group, sorted by the grouped values
+        return [key + tuple(self.groups[key]) for key in sorted(self.groups)]
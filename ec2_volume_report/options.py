@@ -0,0 +1,107 @@
+# Report options shared by the CLI and the library API.
+# Kept free of boto3 so the CLI can parse its arguments (and answer --help) without importing it.
+import os
+import argparse
+import datetime
+
+STATUS_ARGS = ['creating', 'available', 'in-use', 'deleting', 'deleted', 'error']
+TYPE_ARGS = ['gp2', 'io1', 'st1', 'sc1', 'standard']
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'ec2-volume-report')
+
+# Every option understood by the library, with its default. The CLI arguments use the same names.
+OPTION_DEFAULTS = {
+    # AWS search filters
+    'id': None,
+    'size': None,
+    'status': None,
+    'type': None,
+    'zone': None,
+    # Custom search filters
+    'greater_than': None,
+    'lower_than': None,
+    'missing': None,
+    'name': None,
+    'name_exact': None,
+    'owner': None,
+    'owner_exact': None,
+    'project': None,
+    'project_exact': None,
+    'range_lower': None,
+    'range_upper': None,
+    'tag': None,
+    'tag_exact': None,
+    'match': 'any',
+    'unattached_days': None,
+    'no_snapshot_since': None,
+    # Enrichment
+    'with_attachments': False,
+    'with_snapshots': False,
+    # Performance
+    'parallel': 8,
+    'no_pushdown': False,
+    'region_timeout': 300,
+    # Cache
+    'cache': False,
+    'cache_ttl': 900,
+    'cache_dir': DEFAULT_CACHE_DIR,
+    'refresh': False,
+    'offline': False,
+}
+
+def build_options(filters=None, **settings):
+    # Build a complete options namespace from the defaults, FILTERS and SETTINGS use the option names above
+    opts = argparse.Namespace(**OPTION_DEFAULTS)
+    for name, value in dict(filters or {}, **settings).items():
+        if name not in OPTION_DEFAULTS:
+            raise TypeError('unknown option ' + repr(name))
+        setattr(opts, name, value)
+    if opts.missing:
+        opts.missing = [str.lower(missing) for missing in opts.missing]
+    validate_options(opts)
+    return opts
+
+def validate_options(opts):
+    # Reject inconsistent options up front rather than once per volume during the scan, raises ValueError
+    # A zero size bound is no bound, as in the original report
+    if opts.lower_than == 0:
+        opts.lower_than = None
+    if opts.greater_than == 0:
+        opts.greater_than = None
+    if opts.range_lower == 0 or opts.range_upper == 0:
+        opts.range_lower = opts.range_upper = None
+    if opts.range_lower is not None and opts.range_upper is None:
+        raise ValueError("--range-lower requires that --range-upper is also defined.")
+    if opts.range_upper is not None and opts.range_lower is None:
+        raise ValueError("--range-upper requires that --range-lower is also defined.")
+    if opts.range_lower is not None and opts.range_lower > opts.range_upper:
+        raise ValueError("--range-lower must not be greater than --range-upper.")
+    if opts.match not in ('any', 'all'):
+        raise ValueError("--match must be 'any' or 'all'.")
+    if opts.refresh and opts.offline:
+        raise ValueError("--refresh and --offline cannot be used together.")
+    if opts.refresh or opts.offline:
+        opts.cache = True
+    if opts.unattached_days is not None:
+        if opts.unattached_days < 0:
+            raise ValueError("--unattached-days must not be negative.")
+        opts.with_attachments = True
+    if opts.no_snapshot_since is not None:
+        opts.no_snapshot_since = parse_time(opts.no_snapshot_since)
+        opts.with_snapshots = True
+    if opts.offline and (opts.with_attachments or opts.with_snapshots):
+        raise ValueError("--with-attachments, --with-snapshots, --unattached-days and --no-snapshot-since need AWS and cannot be used with --offline.")
+    if opts.parallel < 1:
+        raise ValueError("--parallel must be at least 1.")
+    if opts.region_timeout < 1:
+        raise ValueError("--region-timeout must be at least 1.")
+
+def parse_time(value):
+    # Accept a date (YYYY-MM-DD, midnight UTC), an ISO 8601 time, or a date/datetime object, and return a timezone-aware datetime
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError("--no-snapshot-since must be a date (YYYY-MM-DD) or an ISO 8601 time.")
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
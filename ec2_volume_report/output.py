@@ -0,0 +1,112 @@
+# Output rendering
+import sys
+import csv
+import json
+
+from .records import BASE_COLUMNS
+
+# Define output color classes
+class bcolors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+
+WATCH_MARKS = {'added': '+', 'removed': '-', 'changed': '~'}   # Prefix of the --watch events without an output format
+
+class RowWriter:
+    # Write volume records to OUT (default stdout). Without an output format the original tab separated rows are written, without a header.
+    # With a format the columns are stable : Account for multi-account reports, the standard columns, the EXTRA_COLUMNS of enrichment, then one per custom tag in TAG_COLUMNS.
+    def __init__(self, output_format=None, tag_columns=None, out=None, accounts=False, extra_columns=()):
+        self.format = output_format
+        self.columns = (['Account'] if accounts else []) + BASE_COLUMNS + list(extra_columns)
+        seen = set(str.lower(column) for column in self.columns)
+        for custom_tag in tag_columns or []:   # A --tag named like a column (e.g. --tag name) is that column, and each tag gets one column whatever its case
+            if str.lower(custom_tag) not in seen:
+                seen.add(str.lower(custom_tag))
+                self.columns.append(custom_tag)
+        self.out = out if out is not None else sys.stdout
+        self.csv_writer = csv.writer(self.out, lineterminator='\n')
+
+    def header(self):
+        if self.format == 'csv':
+            self.csv_writer.writerow(self.columns)
+        elif self.format == 'tsv':
+            print('\t'.join(self.columns), file=self.out)
+
+    def row(self, record):
+        if self.format is None:
+            print("\t".join(record.values()), file=self.out)
+        elif self.format == 'csv':
+            self.csv_writer.writerow([record.get(column, '') for column in self.columns])
+        elif self.format == 'tsv':
+            print('\t'.join(' '.join(record.get(column, '').split('\t')) for column in self.columns), file=self.out)
+        elif self.format == 'ndjson':
+            print(json.dumps({column: record.get(column) for column in self.columns}), file=self.out)
+
+    def event_header(self):
+        # Header of the --watch delta stream : the event, the columns of the volume, then its changes
+        if self.format == 'csv':
+            self.csv_writer.writerow(['Event'] + self.columns + ['Changes'])
+        elif self.format == 'tsv':
+            print('\t'.join(['Event'] + self.columns + ['Changes']), file=self.out)
+
+    def event(self, event, record, changes=None):
+        # Write one --watch event : 'added', 'removed' or 'changed' with CHANGES as {column: (old, new)}.
+        # Without a format the row is prefixed with +, - or ~ and each change follows on its own indented line.
+        described = '; '.join(column + ': ' + old + ' -> ' + new for column, (old, new) in (changes or {}).items())
+        if self.format is None:
+            print(WATCH_MARKS[event] + "\t" + "\t".join(record.values()), file=self.out)
+            for column, (old, new) in (changes or {}).items():
+                print("\t" + column + " : " + old + " -> " + new, file=self.out)
+        elif self.format == 'csv':
+            self.csv_writer.writerow([event] + [record.get(column, '') for column in self.columns] + [described])
+        elif self.format == 'tsv':
+            print('\t'.join(' '.join(value.split('\t')) for value in [event] + [record.get(column, '') for column in self.columns] + [described]), file=self.out)
+        elif self.format == 'ndjson':
+            line = {'Event': event}
+            line.update((column, record.get(column)) for column in self.columns)
+            if changes:
+                line['Changes'] = {column: list(values) for column, values in changes.items()}
+            print(json.dumps(line), file=self.out)
+
+def write_summary(total, output_format=None):
+    summary_file = sys.stdout if output_format is None else sys.stderr   # Keep machine-readable output parseable
+    print('------------------', file=summary_file)
+    print('Total Volumes : ' + str(total), file=summary_file)
+
+def write_groups(totals, output_format=None, out=None):
+    # Write the group-by report : an aligned table with a TOTAL row, delimited rows with a header for tsv/csv, or one JSON object per group
+    out = out if out is not None else sys.stdout
+    columns = totals.columns + ['Volumes', 'GiB']
+    rows = totals.rows()
+    if output_format == 'ndjson':
+        for row in rows:
+            print(json.dumps(dict(zip(columns, row))), file=out)
+    elif output_format == 'csv':
+        csv_writer = csv.writer(out, lineterminator='\n')
+        csv_writer.writerow(columns)
+        csv_writer.writerows(rows)
+    elif output_format == 'tsv':
+        print('\t'.join(columns), file=out)
+        for row in rows:
+            print('\t'.join(' '.join(str(value).split('\t')) for value in row), file=out)
+    else:
+        total = ('TOTAL',) + ('',) * (len(totals.columns) - 1) + (sum(row[-2] for row in rows), sum(row[-1] for row in rows))
+        widths = [max(len(str(row[i])) for row in [columns, total] + rows) for i in range(len(columns))]
+
+        def line(row):
+            # Grouped values left-aligned, counts right-aligned
+            return '  '.join(str(value).ljust(width) if i < len(totals.columns) else str(value).rjust(width) for i, (value, width) in enumerate(zip(row, widths)))
+
+        separator = '-' * sum(widths + [2 * (len(widths) - 1)])
+        print(line(columns), file=out)
+        print(separator, file=out)
+        for row in rows:
+            print(line(row), file=out)
+        print(separator, file=out)
+        print(line(total), file=out)
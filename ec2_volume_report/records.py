@@ -0,0 +1,119 @@
+# Compact volume records
+import sys
+from collections.abc import Mapping
+
+# Column name -> record attribute, in column order
+FIELDS = {
+    'Account': 'account',
+    'Region': 'region',
+    'Zone': 'zone',
+    'Volume ID': 'volume_id',
+    'Size': 'size',
+    'Type': 'type',
+    'Status': 'status',
+    'Name': 'name',
+    'Owner': 'owner',
+    'Project': 'project',
+    'Created': 'created',
+    'Instance': 'instance',
+    'Instance State': 'instance_state',
+    'Last Snapshot': 'last_snapshot',
+    'Snapshots': 'snapshots',
+}
+BASE_COLUMNS = list(FIELDS)[1:11]   # The columns of every record, Account is only set in multi-account scans
+ATTACHMENT_COLUMNS = ('Instance', 'Instance State')   # --with-attachments
+SNAPSHOT_COLUMNS = ('Last Snapshot', 'Snapshots')   # --with-snapshots
+ENRICHED = frozenset(ATTACHMENT_COLUMNS + SNAPSHOT_COLUMNS)
+
+# Text rendered for a missing value, the record itself stores None
+PLACEHOLDERS = {
+    'Zone': 'NO_ZONE',
+    'Volume ID': 'NO_VOL_ID',
+    'Size': 'SIZE_UND',
+    'Type': 'TYP_UND',
+    'Status': 'STATE_UND',
+    'Name': 'NO_NAME',
+    'Owner': 'NO_OWNER',
+    'Project': 'NO_PROJECT',
+    'Created': 'CREATION_UND',
+    'Instance': 'NO_INSTANCE',
+    'Instance State': 'NO_INSTANCE',
+    'Last Snapshot': 'NO_SNAPSHOT',
+}
+
+def intern(value):
+    return sys.intern(value) if value is not None else None
+
+def enrichment_columns(with_attachments=False, with_snapshots=False):
+    # The enrichment columns of a scan, one shared tuple for all of its records
+    return ENRICHMENT_COLUMNS[(bool(with_attachments), bool(with_snapshots))]
+
+ENRICHMENT_COLUMNS = {
+    (False, False): (),
+    (True, False): ATTACHMENT_COLUMNS,
+    (False, True): SNAPSHOT_COLUMNS,
+    (True, True): ATTACHMENT_COLUMNS + SNAPSHOT_COLUMNS,
+}
+
+class VolumeRecord(Mapping):
+    # One volume of the report, without a per-record dict : the fields keep their raw values (int size, datetime creation time, None when missing),
+    # and the values repeated across the fleet (account, region, zone, type, status) are interned so every record shares one copy.
+    # TAGS holds the custom --tag tags found on the volume keyed by their real key, or None. EXTRA is the tuple of enrichment columns the scan joined in, see enrichment_columns().
+    # Read as a mapping, the record renders column -> text with the placeholders, like the original record dicts.
+    __slots__ = ('account', 'region', 'zone', 'volume_id', 'size', 'type', 'status', 'name', 'owner', 'project', 'created', 'tags',
+                 'instance', 'instance_state', 'last_snapshot', 'snapshots', 'extra')
+
+    def __init__(self, region, zone=None, volume_id=None, size=None, type=None, status=None, name=None, owner=None, project=None, created=None, tags=None, account=None,
+                 instance=None, instance_state=None, last_snapshot=None, snapshots=0, extra=()):
+        self.account = intern(account)
+        self.region = intern(region)
+        self.zone = intern(zone)
+        self.volume_id = volume_id
+        self.size = size
+        self.type = intern(type)
+        self.status = intern(status)
+        self.name = name
+        self.owner = owner
+        self.project = project
+        self.created = created
+        self.tags = tags
+        self.instance = instance
+        self.instance_state = intern(instance_state)
+        self.last_snapshot = last_snapshot
+        self.snapshots = snapshots
+        self.extra = extra
+
+    def render(self, column):
+        # Text of COLUMN, or its placeholder when the value is missing. Raises KeyError for a column the record does not have.
+        attribute = FIELDS.get(column)
+        if attribute is None:
+            if self.tags:
+                if column in self.tags:
+                    return self.tags[column]
+                # The --tag columns of --format and --group-by are named as on the command line, the tags keep the key of the volume
+                for key, value in self.tags.items():
+                    if str.lower(key) == str.lower(column):
+                        return value
+            raise KeyError(column)
+        if (attribute == 'account' and self.account is None) or (column in ENRICHED and column not in self.extra):
+            raise KeyError(column)
+        value = getattr(self, attribute)
+        if value is None:
+            return PLACEHOLDERS[column]
+        return value if isinstance(value, str) else str(value)
+
+    __getitem__ = render
+
+    def __iter__(self):
+        if self.account is not None:
+            yield 'Account'
+        yield from BASE_COLUMNS
+        yield from self.extra
+        if self.tags:
+            yield from self.tags
+
+    def __len__(self):
+        return len(BASE_COLUMNS) + (self.account is not None) + len(self.extra) + len(self.tags or ())
+
+    def __repr__(self):
+        return 'VolumeRecord(' + repr(dict(self)) + ')'
@@ -0,0 +1,346 @@
+# Region discovery and concurrent volume scans built on the describe_volumes paginator
+import re
+import sys
+import time
+import queue
+import datetime
+import weakref
+import itertools
+import threading
+import concurrent.futures
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .options import build_options
+from .filters import get_aws_filters, compile_filters
+from .cache import InventoryCache
+from .records import VolumeRecord, BASE_COLUMNS, enrichment_columns
+
+PAGE_SIZE = 1000   # MaxResults sent with each DescribeVolumes call
+POOL_CONNECTIONS = 10   # Connections kept open by each region client, at least one per thread calling the region at the same time
+RETRY_MODE = 'standard'   # botocore retry mode : exponential backoff with jitter, and a retry quota so a failing region stops retrying
+RETRY_ATTEMPTS = 5   # Attempts per call, the first one included
+CONNECT_TIMEOUT = 10   # Seconds to open a connection, an unreachable endpoint fails fast instead of using the whole region timeout
+READ_TIMEOUT = 60   # Seconds to wait for a response
+DISABLED_OPT_IN = 'not-opted-in'   # OptInStatus of the regions the account has not enabled
+DENIED_CODES = ('UnauthorizedOperation', 'AccessDenied')   # Error codes of a call the credentials are not allowed to make
+
+def make_record(volume, region, tag_columns=None, account=None, extra=()):
+    # Build the record straight from the DescribeVolumes response dict, missing fields stay None and get their placeholder when rendered
+    # List of available attributes : https://docs.aws.amazon.com/AWSEC2/latest/APIReference/API_Volume.html
+    # EXTRA is the tuple of enrichment columns joined into the volume by join_volume()
+    name = owner = project = custom_tags = instance = instance_state = None
+
+    # Add tag information to the record
+    for tag in volume.get('Tags', []):
+        key = str.lower(tag['Key'])
+        if key == 'name':    # Check for any tags with a value of Name or name
+            name = tag['Value']
+        elif key == 'owner':
+            owner = tag['Value']
+        elif key == 'project':
+            project = tag['Value']
+
+        if tag_columns and tag['Key'] not in BASE_COLUMNS:   # Loop over the list of custom tags if present, a tag named like a column (e.g. Name) is that column
+            for custom_tag in tag_columns:
+                if key == str.lower(custom_tag):
+                    if custom_tags is None:
+                        custom_tags = dict()
+                    custom_tags[tag['Key']] = tag['Value']   # Keyed by the tag key of the volume, as the default and debug output show it
+
+    # Add the attached instances, several for multi-attach volumes
+    if volume.get('Instances'):
+        instance = ','.join(attached['InstanceId'] for attached in volume['Instances'])
+        instance_state = ','.join(attached['State'] or 'STATE_UND' for attached in volume['Instances'])
+
+    return VolumeRecord(
+        region,   # Store the AWS Region of the volume
+        zone=volume.get('AvailabilityZone') or None,   # Store the Availability Zone of the volume
+        volume_id=volume.get('VolumeId') or None,   # Store the Volume ID
+        size=volume.get('Size') or None,   # Store the Volume Size (GB)
+        type=volume.get('VolumeType') or None,   # Store the Volume Type
+        status=volume.get('State') or None,   # Store the Volume state
+        name=name,
+        owner=owner,
+        project=project,
+        created=volume.get('CreateTime') or None,   # Store the Volume Creation time
+        tags=custom_tags,
+        account=account,
+        instance=instance,
+        instance_state=instance_state,
+        last_snapshot=volume.get('LastSnapshotTime'),
+        snapshots=volume.get('SnapshotCount', 0),
+        extra=extra,
+    )
+
+def stopped_at(instance):
+    # Time a stopped instance was stopped, from its StateTransitionReason : 'User initiated (2019-05-03 14:12:51 GMT)'
+    found = re.search(r'\((\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) GMT\)', instance.get('StateTransitionReason') or '')
+    if instance['State']['Name'] != 'stopped' or not found:
+        return None
+    return datetime.datetime.strptime(found.group(1), '%Y-%m-%d %H:%M:%S').replace(tzinfo=datetime.timezone.utc)
+
+def join_volume(volume, instances=None, snapshots=None):
+    # Join the region indexes into a DescribeVolumes dict, under keys EC2 does not use :
+    # 'Instances' the attached instances with their state and stop time, 'LastSnapshotTime' and 'SnapshotCount' its completed snapshots
+    if instances is not None:
+        volume['Instances'] = []
+        for attachment in volume.get('Attachments', []):
+            state, stopped = instances.get(attachment['InstanceId'], (None, None))
+            volume['Instances'].append({'InstanceId': attachment['InstanceId'], 'State': state, 'StoppedAt': stopped})
+    if snapshots is not None:
+        volume['LastSnapshotTime'], volume['SnapshotCount'] = snapshots.get(volume.get('VolumeId'), (None, 0))
+
+def call_timeouts(region_timeout, attempts):
+    # Fit every attempt of a call and the standard retry backoff between them (at most 1, 2, 4... seconds) in REGION_TIMEOUT,
+    # so a stalled region cannot keep a worker busy much longer than it : half of it for the backoff, the other half split between the attempts.
+    # Returns (attempts, connect timeout, read timeout), with fewer attempts when their backoff alone would not fit.
+    while attempts > 1 and 2 ** (attempts - 1) - 1 > region_timeout / 2:
+        attempts -= 1
+    budget = region_timeout / 2 / attempts
+    connect_timeout = min(CONNECT_TIMEOUT, budget / 2)
+    return attempts, connect_timeout, min(READ_TIMEOUT, budget - connect_timeout)
+
+def print_error(region, error):
+    print('ERROR : ' + region + ' : ' + str(error), file=sys.stderr)
+
+class Scanner:
+    # Scans volumes through one boto3 session. The EC2 clients form a pool of one client per region (and retry policy and region timeout), created on first use
+    # and shared by every region listing, zone listing, scan and deletion of the session.
+    # ACCOUNT labels the records of multi-account scans and keys their cache entries, ENDPOINT_URL replaces the EC2 endpoint (e.g. a local stand-in).
+    # POOL_CONNECTIONS is the connection pool of each client, raise it to the number of threads calling one region at the same time.
+    def __init__(self, session=None, region_timeout=300, stats=None, account=None, endpoint_url=None, pool_connections=POOL_CONNECTIONS):
+        self.session = session if session is not None else boto3.Session()
+        self.account = account
+        self.profile = account or self.session.profile_name or 'default'
+        self.region_timeout = region_timeout
+        self.stats = stats
+        self.endpoint_url = endpoint_url
+        self.pool_connections = pool_connections
+        self.clients = dict()
+        self.lock = threading.Lock()   # boto3 sessions are not thread-safe, serialise client creation
+        if stats:
+            stats.install(self.session, account)
+
+    def client(self, region, attempts=RETRY_ATTEMPTS, region_timeout=None):
+        # The pooled client of REGION, ATTEMPTS=1 disables botocore retries for callers doing their own backoff.
+        # Its call timeouts fit in REGION_TIMEOUT (default: the one of the scanner), the clients are pooled per timeout.
+        region_timeout = region_timeout or self.region_timeout
+        key = (region, attempts, region_timeout)
+        with self.lock:
+            if key not in self.clients:
+                total_attempts, connect_timeout, read_timeout = call_timeouts(region_timeout, attempts)
+                config = Config(
+                    connect_timeout=connect_timeout,
+                    read_timeout=read_timeout,
+                    max_pool_connections=self.pool_connections,
+                    retries={'mode': RETRY_MODE, 'total_max_attempts': total_attempts}
+                )
+                self.clients[key] = self.session.client('ec2', region_name=region, config=config, endpoint_url=self.endpoint_url)
+            return self.clients[key]
+
+    def label(self, region):
+        # Name of a region in errors and statistics, prefixed with the account in multi-account scans
+        return region if self.account is None else self.account + ' : ' + region
+
+    def get_regions(self, cache=None):
+        # Obtain the regions enabled for the account, served from the cache when given.
+        # DescribeRegions reports the opt-in status of every region, the opt-in regions the account has not enabled are left out.
+        # Without the permission to call it, fall back to the static botocore list (status unknown), which is never cached : it would include
+        # the regions the account has not enabled. Any other error (throttling, network, expired credentials) is raised.
+        if cache and cache.fresh(self.profile, '', 'regions'):
+            listing = cache.load_listing(self.profile, '', 'regions')
+        else:
+            try:
+                response = self.client(self.session.region_name or 'us-east-1').describe_regions(AllRegions=True)
+            except ClientError as e:
+                if e.response['Error']['Code'] not in DENIED_CODES:
+                    raise
+                print_error(self.label('describe_regions'), str(e) + ', using the static region list')
+                return self.session.get_available_regions('ec2')
+            listing = [(region['RegionName'], region.get('OptInStatus')) for region in response['Regions']]
+            if cache:
+                cache.store_listing(self.profile, '', 'regions', listing)
+        return [name for name, status in listing if status != DISABLED_OPT_IN]
+
+    def describe_zones(self, region, cache=None):
+        # Obtain all accessible availablility zones of a region for this session, served from the cache when given
+        if cache and cache.fresh(self.profile, region, 'zones'):
+            return [{'ZoneName': name, 'State': state} for name, state in cache.load_listing(self.profile, region, 'zones')]
+        zones = self.client(region).describe_availability_zones()['AvailabilityZones']
+        if cache:
+            cache.store_listing(self.profile, region, 'zones', ((zone['ZoneName'], zone['State']) for zone in zones))
+        return zones
+
+    def fetch_volumes(self, region, aws_filters, timeout):
+        # Page through the raw DescribeVolumes responses, the plain dicts are much cheaper than building a resource object per volume
+        started = time.monotonic()
+        paginator = self.client(region, region_timeout=timeout).get_paginator('describe_volumes')
+        pages = paginator.paginate(   # Filter the list of returned volumes - https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/ec2/paginator/DescribeVolumes.html
+            # List of available filters : https://docs.aws.amazon.com/AWSEC2/latest/APIReference/API_DescribeVolumes.html
+            Filters=aws_filters,
+            PaginationConfig={'PageSize': PAGE_SIZE}
+        )
+        for page in pages:
+            if time.monotonic() - started > timeout:
+                raise TimeoutError('region scan exceeded ' + str(timeout) + ' seconds')
+            yield page['Volumes']
+
+    def fetch_instances(self, region, timeout=None):
+        # Index the instances of a region by ID : {instance ID: (state, stopped at)}, in one paginated pass instead of a call per volume
+        index = dict()
+        paginator = self.client(region, region_timeout=timeout).get_paginator('describe_instances')
+        for page in paginator.paginate(PaginationConfig={'PageSize': PAGE_SIZE}):
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    index[instance['InstanceId']] = (instance['State']['Name'], stopped_at(instance))
+        return index
+
+    def fetch_snapshots(self, region, timeout=None):
+        # Index the completed snapshots owned by the account by volume ID : {volume ID: (latest start time, count)}, in one paginated pass
+        index = dict()
+        paginator = self.client(region, region_timeout=timeout).get_paginator('describe_snapshots')
+        pages = paginator.paginate(
+            OwnerIds=['self'],
+            Filters=[{'Name': 'status', 'Values': ['completed']}],
+            PaginationConfig={'PageSize': PAGE_SIZE}
+        )
+        for page in pages:
+            for snapshot in page['Snapshots']:
+                latest, count = index.get(snapshot['VolumeId'], (snapshot['StartTime'], 0))
+                index[snapshot['VolumeId']] = (max(latest, snapshot['StartTime']), count + 1)
+        return index
+
+    def scan_region(self, region, opts, aws_filters, volume_filter, cache=None):
+        # Scan a single region and yield the records of the matching volumes one page at a time
+        # With --with-attachments / --with-snapshots the instances and snapshots of the region are indexed and joined into every volume,
+        # the indexes are only fetched once a page holds volumes so a region without any costs no extra call
+        extra = enrichment_columns(opts.with_attachments, opts.with_snapshots)
+        indexed = False
+        if cache:
+            # Refresh the snapshot with the whole region when it is stale, then query the snapshot in pages
+            if not cache.fresh(self.profile, region, 'volumes'):
+                cache.store_volumes(self.profile, region, [volume for page in self.fetch_volumes(region, [], opts.region_timeout) for volume in page])
+            cached = cache.load_volumes(self.profile, region, aws_filters)
+            pages = iter(lambda: list(itertools.islice(cached, PAGE_SIZE)), [])
+        else:
+            pages = self.fetch_volumes(region, aws_filters, opts.region_timeout)
+
+        for page in pages:
+            if extra and page:
+                if not indexed:
+                    instances = self.fetch_instances(region, opts.region_timeout) if opts.with_attachments else None
+                    snapshots = self.fetch_snapshots(region, opts.region_timeout) if opts.with_snapshots else None
+                    indexed = True
+                for volume in page:
+                    join_volume(volume, instances, snapshots)
+            records = [make_record(volume, region, opts.tag, self.account, extra) for volume in page if volume_filter(volume)]
+            if self.stats:
+                self.stats.add(region, account=self.account, fetched=len(page), matched=len(records))
+            yield records
+
+    def scan(self, regions, opts, cache=None, on_error=print_error):
+        # Scan the regions of this session concurrently, see scan_targets()
+        for _, region, records in scan_targets([(self, region) for region in regions], opts, cache, on_error):
+            yield region, records
+
+def scan_targets(targets, opts, cache=None, on_error=print_error, extra_filters=()):
+    # Scan the (scanner, region) pairs of TARGETS concurrently, at most opts.parallel at a time, whatever the account.
+    # Yield (scanner, region, records) as soon as each page has been filtered, then (scanner, region, None) once a region is complete.
+    # A failing region, or one not complete opts.region_timeout seconds after its scan started, is passed to ON_ERROR and never completes,
+    # without affecting the others. A timed out region is abandoned even while its worker is still waiting on a call.
+    # EXTRA_FILTERS are sent to the API with the filters of OPTS, the cache only supports the filters the options produce.
+    aws_filters = list(get_aws_filters(opts)[0].values()) + list(extra_filters)
+    volume_filter = compile_filters(opts)
+    targets = list(dict.fromkeys((scanner, str.lower(region)) for scanner, region in targets))
+    results = queue.Queue(maxsize=opts.parallel * 4)   # Bounded so the scan waits for a slow consumer instead of buffering the fleet
+    stop = threading.Event()
+    deadlines = dict()   # (scanner, region) -> time.monotonic() deadline, set when its scan starts
+    abandoned = set()   # (scanner, region) past their deadline
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def worker(scanner, region):
+        started = time.perf_counter()
+        deadlines[(scanner, region)] = time.monotonic() + opts.region_timeout
+        try:
+            for records in scanner.scan_region(region, opts, aws_filters, volume_filter, cache):
+                if stop.is_set() or (scanner, region) in abandoned:
+                    return   # The consumer stopped early or gave up on the region, do not page through the rest of it
+                put((scanner, region, records, None))
+            put((scanner, region, None, None))
+        except Exception as e:
+            put((scanner, region, None, e))
+        finally:
+            if scanner.stats:
+                scanner.stats.add(region, account=scanner.account, seconds=time.perf_counter() - started)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=opts.parallel)
+    try:
+        for scanner, region in targets:
+            executor.submit(worker, scanner, region)
+        pending = set(targets)
+        while pending:
+            # Wait for the next page, at most until the earliest deadline of the regions being scanned
+            running = [deadlines[target] for target in pending if target in deadlines]
+            try:
+                item = results.get(timeout=max(0, min(running) - time.monotonic()) if running else 0.1)
+            except queue.Empty:
+                item = None
+            now = time.monotonic()
+            for target in [target for target in pending if deadlines.get(target, now + 1) <= now]:
+                pending.discard(target)
+                abandoned.add(target)
+                if on_error:
+                    on_error(target[0].label(target[1]), TimeoutError('region scan exceeded ' + str(opts.region_timeout) + ' seconds'))
+            if item is None:
+                continue
+            scanner, region, records, error = item
+            if (scanner, region) not in pending:
+                continue   # Abandoned
+            if records is not None:
+                yield scanner, region, records
+                continue
+            pending.discard((scanner, region))
+            if error is None:
+                yield scanner, region, None
+            elif on_error:
+                on_error(scanner.label(region), error)
+    finally:
+        stop.set()   # Release workers blocked on a full queue and stop their paging if the consumer stopped early
+        # Regions not started yet are not scanned at all. The calls of abandoned regions are not waited for, their client timeouts fit in the region timeout.
+        executor.shutdown(wait=not abandoned, cancel_futures=True)
+
+# One shared Scanner per session, so repeated library calls reuse the same clients.
+# The scanners only hold a proxy of their session, so the entry (and its clients) goes away with the last reference the caller holds to the session.
+scanners = weakref.WeakKeyDictionary()
+scanners_lock = threading.Lock()
+default_session = None
+
+def get_scanner(session=None):
+    global default_session
+    with scanners_lock:
+        if session is None:
+            if default_session is None:
+                default_session = boto3.Session()
+            session = default_session
+        if session not in scanners:
+            scanners[session] = Scanner(weakref.proxy(session))
+        return scanners[session]
+
+def iter_volumes(regions, filters=None, session=None, on_error=print_error, **settings):
+    # Yield the record of every matching volume in REGIONS as soon as its page has been scanned, the regions are scanned concurrently.
+    # FILTERS and SETTINGS use the option names of ec2_volume_report.options, e.g. iter_volumes(['eu-west-1'], {'owner_exact': ['alice']}, parallel=4)
+    opts = build_options(filters, **settings)
+    scanner = get_scanner(session)
+    for region, records in scanner.scan(regions, opts, InventoryCache.from_options(opts), on_error):
+        if records:
+            yield from records
@@ -0,0 +1,58 @@
+# Run statistics for --stats : per phase timings and per region API counters
+import time
+import functools
+import threading
+import contextlib
+
+THROTTLE_CODES = ('RequestLimitExceeded', 'Throttling', 'ThrottlingException')
+
+# Counters collected for --stats, shared by the region threads
+class RunStats:
+    REGION_FIELDS = ('seconds', 'api_calls', 'pages', 'fetched', 'matched', 'bytes', 'retries', 'throttles')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = dict()
+        self.regions = dict()
+
+    def install(self, session, account=None):
+        # Register the botocore event hooks on a boto3 session, every client created from it afterwards reports to them under ACCOUNT
+        session.events.register('after-call.ec2', functools.partial(self.after_call, account=account))
+        session.events.register('needs-retry.ec2', functools.partial(self.needs_retry, account=account))
+
+    def add(self, region, account=None, **counts):
+        # Counters are kept per region, or per account and region in multi-account scans
+        key = region if account is None else account + '/' + region
+        with self.lock:
+            entry = self.regions.setdefault(key, dict.fromkeys(self.REGION_FIELDS, 0))
+            for field, count in counts.items():
+                entry[field] += count
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0) + seconds
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        # Add the time spent in the block to the phase NAME
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - started)
+
+    def after_call(self, http_response, parsed, model, context, account=None, **kwargs):
+        metadata = parsed.get('ResponseMetadata', {})
+        self.add(context.get('client_region') or 'global', account,
+                 api_calls=1,
+                 pages=1 if model.name == 'DescribeVolumes' else 0,
+                 bytes=len(http_response.content or b'') if http_response is not None else 0,
+                 retries=metadata.get('RetryAttempts', 0))
+
+    def needs_retry(self, response, request_dict, account=None, **kwargs):
+        # Called for every attempt, including the last one, count the throttled responses
+        if response is not None and response[1].get('Error', {}).get('Code') in THROTTLE_CODES:
+            self.add(request_dict.get('context', {}).get('client_region') or 'global', account, throttles=1)
+
+    def as_dict(self):
+        return {'phases': dict(self.phases), 'regions': {region: dict(self.regions[region]) for region in sorted(self.regions)}}
@@ -0,0 +1,90 @@
+# Watch mode : rescan on a schedule and report only the volumes added, removed or changed since the previous scan
+import hashlib
+import datetime
+
+from .scan import scan_targets, print_error
+
+CREATED_MARGIN = 300   # Seconds a cheap check looks back before the previous scan, for volumes that were not listed yet when it ran
+MAX_CREATED_HOURS = 48   # Longest window a cheap check covers, past that a full scan is run instead
+
+def volume_digest(record):
+    # Content hash of a volume as the report renders it, two scans of an unchanged volume give the same digest
+    content = '\x1e'.join(column + '\x1f' + value for column, value in record.items())
+    return hashlib.blake2b(content.encode(), digest_size=16).digest()
+
+def created_filter(since, now):
+    # create-time filter for the volumes created between SINCE and NOW, or None when the window is too long.
+    # EC2 filters take no ranges, only wildcards, so the window is covered with one pattern per UTC hour : '2024-10-18T09*'
+    hour = since.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    patterns = []
+    while hour <= now:
+        patterns.append(hour.strftime('%Y-%m-%dT%H') + '*')
+        hour += datetime.timedelta(hours=1)
+    if len(patterns) > MAX_CREATED_HOURS:
+        return None
+    return {
+        'Name': 'create-time',
+        'Values': patterns
+    }
+
+def changed_fields(old, new):
+    # {column: (old text, new text)} for every column that differs, a column only one record has (e.g. a --tag) is '' on the other side
+    return {column: (old.get(column, ''), new.get(column, '')) for column in dict.fromkeys(list(old) + list(new)) if old.get(column, '') != new.get(column, '')}
+
+class Watcher:
+    # The last snapshot of the (scanner, region) TARGETS, kept in memory as {(account, region): {volume ID: (digest, record)}}.
+    # Every check() rescans and yields (event, record, changes) for the volumes 'added', 'removed' or 'changed' (CHANGES is {column: (old, new)}).
+    # A full scan compares every volume, and runs at least every RECONCILE seconds. In between, a cheap check only lists the volumes created
+    # since the previous scan, so it finds new volumes but not removals or changes. Only a region that completed a full scan reports events :
+    # the first full scan is the silent baseline, and a region that fails keeps its snapshot rather than reporting all of its volumes removed.
+    def __init__(self, targets, opts, cache=None, reconcile=3600, on_error=print_error):
+        self.targets = targets
+        self.opts = opts
+        self.cache = cache
+        self.reconcile = reconcile
+        self.on_error = on_error
+        self.snapshot = dict()
+        self.baselined = set()   # (account, region) that completed a full scan
+        self.scanned = None   # Start of the previous scan
+        self.reconciled = None   # Start of the previous full scan
+
+    def check(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        created = None
+        if self.reconciled is not None and (now - self.reconciled).total_seconds() < self.reconcile:
+            created = created_filter(self.scanned - datetime.timedelta(seconds=CREATED_MARGIN), now)
+        full = created is None
+        seen = dict()   # (account, region) -> volume IDs listed by this full scan
+
+        # Cheap checks always call AWS, the cache cannot answer a create-time filter
+        for scanner, region, records in scan_targets(self.targets, self.opts, self.cache if full else None, self.on_error, [] if full else [created]):
+            key = (scanner.account, region)
+            region_snapshot = self.snapshot.setdefault(key, {})
+            if records is None:
+                # The region is complete : on a full scan, the volumes it did not list again are gone
+                if full:
+                    listed = seen.pop(key, set())
+                    if key in self.baselined:
+                        for vol in [vol for vol in region_snapshot if vol not in listed]:
+                            yield 'removed', region_snapshot.pop(vol)[1], None
+                    else:
+                        for vol in [vol for vol in region_snapshot if vol not in listed]:
+                            del region_snapshot[vol]
+                        self.baselined.add(key)
+                continue
+            for record in records:
+                digest = volume_digest(record)
+                previous = region_snapshot.get(record.volume_id)
+                region_snapshot[record.volume_id] = (digest, record)
+                if full:
+                    seen.setdefault(key, set()).add(record.volume_id)
+                if key not in self.baselined:
+                    continue
+                if previous is None:
+                    yield 'added', record, None
+                elif previous[0] != digest:
+                    yield 'changed', record, changed_fields(previous[1], record)
+
+        self.scanned = now
+        if full:
+            self.reconciled = now
@@ -0,0 +1,65 @@
+# Run the tests against the package of this checkout, with EC2 stubbed out
+import os
+import sys
+import fnmatch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+
+def match_filter(data, aws_filter):
+    # DescribeVolumes filter semantics : exact, case-sensitive values, create-time takes wildcards
+    values = [str(value) for value in aws_filter['Values']]
+    tags = data.get('Tags', [])
+    name = aws_filter['Name']
+    if name == 'tag-key':
+        return any(tag['Key'] in values for tag in tags)
+    if name == 'tag-value':
+        return any(tag['Value'] in values for tag in tags)
+    if name == 'create-time':
+        created = data['CreateTime'].strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        return any(fnmatch.fnmatchcase(created, value) for value in values)
+    fields = {'volume-id': 'VolumeId', 'volume-type': 'VolumeType', 'availability-zone': 'AvailabilityZone', 'size': 'Size', 'status': 'State'}
+    return str(data[fields[name]]) in values
+
+class StubResponse:
+    headers = {}
+    content = b''
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+@pytest.fixture
+def stub_session(monkeypatch):
+    # Factory of sessions whose DescribeVolumes calls are answered from FLEET ({region: [volume dicts]}), no request leaves the process.
+    # The parameters of every call are appended to CALLS as (region, params), the regions in FAILING answer with an error.
+    monkeypatch.setenv('AWS_EC2_METADATA_DISABLED', 'true')
+
+    def make(fleet, calls=None, failing=()):
+        session = boto3.Session(aws_access_key_id='AKIATEST', aws_secret_access_key='test', region_name='us-east-1')
+
+        def keep_params(params, context, **kwargs):
+            context['stub_params'] = dict(params)
+
+        def answer(model, context, **kwargs):
+            region = context['client_region']
+            params = context.get('stub_params', {})
+            if calls is not None:
+                calls.append((region, params))
+            if region in failing:
+                return StubResponse(403), {'Error': {'Code': 'UnauthorizedOperation', 'Message': region + ' is failing'}, 'ResponseMetadata': {'HTTPStatusCode': 403}}
+            volumes = [data for data in fleet.get(region, []) if all(match_filter(data, aws_filter) for aws_filter in params.get('Filters', []))]
+            start = int(params.get('NextToken') or 0)
+            end = start + (params.get('MaxResults') or len(volumes) or 1)
+            response = {'Volumes': [dict(data) for data in volumes[start:end]], 'ResponseMetadata': {'HTTPStatusCode': 200, 'RetryAttempts': 0}}
+            if end < len(volumes):
+                response['NextToken'] = str(end)
+            return StubResponse(200), response
+
+        session._session.register('before-parameter-build.ec2.DescribeVolumes', keep_params)
+        session._session.register('before-call.ec2.DescribeVolumes', answer)
+        return session
+
+    return make
@@ -0,0 +1,119 @@
+# Bulk deletion against stub EC2 clients : retries of throttled calls, dry runs, skipped volumes and the per account and region rate limits
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+from ec2_volume_report import delete
+from ec2_volume_report.records import VolumeRecord
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code + ' message'}}, 'DeleteVolume')
+
+class StubClient:
+    # Answers DeleteVolume with the next error of ERRORS[volume ID] (a code, or None to succeed), then succeeds
+    def __init__(self, errors=None):
+        self.errors = {vol: list(codes) for vol, codes in (errors or {}).items()}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def delete_volume(self, VolumeId, DryRun=False):
+        with self.lock:
+            self.calls.append((VolumeId, DryRun))
+            codes = self.errors.get(VolumeId)
+            code = codes.pop(0) if codes else None
+        if code:
+            raise client_error(code)
+        return {}
+
+class StubScanner:
+    def __init__(self, client):
+        self.stub_client = client
+        self.requested = []
+
+    def client(self, region, attempts=5):
+        self.requested.append((region, attempts))
+        return self.stub_client
+
+class RecordingBucket(delete.TokenBucket):
+    created = []
+
+    def __init__(self, rate):
+        super().__init__(rate)
+        self.acquired = 0
+        RecordingBucket.created.append(self)
+
+    def acquire(self):
+        self.acquired += 1
+        super().acquire()
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(delete, 'DELETE_BACKOFF_BASE', 0.001)
+
+def records_of(*volumes):
+    # (volume ID, region, status, account) -> {volume ID: record}
+    return {vol: VolumeRecord(region, volume_id=vol, status=status, account=account) for vol, region, status, account in volumes}
+
+def test_deletes_available_volumes_without_botocore_retries():
+    client = StubClient()
+    scanner = StubScanner(client)
+    results = delete.delete_volumes(records_of(('vol-1', 'us-east-1', 'available', None), ('vol-2', 'us-east-1', 'available', None)), {None: scanner}, rate=100)
+    assert results == {'vol-1': ('deleted', 1, ''), 'vol-2': ('deleted', 1, '')}
+    assert sorted(client.calls) == [('vol-1', False), ('vol-2', False)]
+    assert scanner.requested == [('us-east-1', 1)]
+
+def test_throttled_deletes_are_retried():
+    client = StubClient({'vol-1': ['RequestLimitExceeded', 'RequestLimitExceeded']})
+    results = delete.delete_volumes(records_of(('vol-1', 'us-east-1', 'available', None)), {None: StubScanner(client)}, rate=100, retries=3)
+    assert results['vol-1'] == ('deleted', 3, '')
+    assert len(client.calls) == 3
+
+def test_throttled_deletes_fail_after_the_retries():
+    client = StubClient({'vol-1': ['RequestLimitExceeded'] * 10})
+    results = delete.delete_volumes(records_of(('vol-1', 'us-east-1', 'available', None)), {None: StubScanner(client)}, rate=100, retries=2)
+    result, attempts, detail = results['vol-1']
+    assert (result, attempts) == ('failed', 3)
+    assert detail.startswith('RequestLimitExceeded')
+    assert len(client.calls) == 3
+
+def test_other_errors_are_not_retried():
+    client = StubClient({'vol-1': ['VolumeInUse']})
+    results = delete.delete_volumes(records_of(('vol-1', 'us-east-1', 'available', None)), {None: StubScanner(client)}, rate=100)
+    assert results['vol-1'][:2] == ('failed', 1)
+    assert len(client.calls) == 1
+
+def test_dry_run_is_reported():
+    client = StubClient({'vol-1': ['DryRunOperation']})
+    results = delete.delete_volumes(records_of(('vol-1', 'us-east-1', 'available', None)), {None: StubScanner(client)}, dry_run=True, rate=100)
+    assert results['vol-1'] == ('dry-run', 1, 'DryRunOperation message')
+    assert client.calls == [('vol-1', True)]
+
+def test_volumes_not_available_are_skipped():
+    client = StubClient()
+    reported = []
+    results = delete.delete_volumes(records_of(('vol-1', 'us-east-1', 'in-use', None), ('vol-2', 'us-east-1', 'available', None)), {None: StubScanner(client)},
+                                    rate=100, on_result=lambda vol, *result: reported.append(vol))
+    assert results['vol-1'] == ('skipped', 0, 'volume is in-use')
+    assert client.calls == [('vol-2', False)]
+    assert sorted(reported) == ['vol-1', 'vol-2']
+
+def test_one_bucket_per_account_and_region(monkeypatch):
+    monkeypatch.setattr(delete, 'TokenBucket', RecordingBucket)
+    RecordingBucket.created = []
+    clients = {'111': StubClient(), '222': StubClient()}
+    scanners = {account: StubScanner(client) for account, client in clients.items()}
+    records = records_of(('vol-1', 'us-east-1', 'available', '111'), ('vol-2', 'us-east-1', 'available', '111'), ('vol-3', 'eu-west-1', 'available', '111'),
+                         ('vol-4', 'us-east-1', 'available', '222'))
+    delete.delete_volumes(records, scanners, rate=100)
+    assert sorted(bucket.acquired for bucket in RecordingBucket.created) == [1, 1, 2]
+    assert sorted(scanners['111'].requested) == [('eu-west-1', 1), ('us-east-1', 1)]
+    assert scanners['222'].requested == [('us-east-1', 1)]
+    assert sorted(vol for vol, _ in clients['222'].calls) == ['vol-4']
+
+def test_token_bucket_limits_the_rate():
+    bucket = delete.TokenBucket(20)
+    started = delete.time.monotonic()
+    for _ in range(30):   # 20 tokens at once, then 10 more at 20 per second
+        bucket.acquire()
+    assert 0.4 <= delete.time.monotonic() - started < 2
@@ -0,0 +1,128 @@
+# Parity of the custom search filters with the original report, through a stubbed DescribeVolumes.
+# Every case is scanned with the filters pushed down to the API, evaluated client-side only (--no-pushdown) and answered from the cache,
+# and must return exactly the volumes the original per-filter checks select.
+import datetime
+
+import pytest
+
+from ec2_volume_report import iter_volumes
+
+REGIONS = ['us-east-1', 'eu-west-1']
+CREATED = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+def volume(vol, region, size, state='available', volume_type='gp2', tags=None):
+    data = {'VolumeId': vol, 'AvailabilityZone': region + 'a', 'Size': size, 'VolumeType': volume_type, 'State': state, 'CreateTime': CREATED, 'Attachments': []}
+    if tags is not None:
+        data['Tags'] = [{'Key': key, 'Value': value} for key, value in tags]
+    return data
+
+FLEET = {
+    'us-east-1': [
+        volume('vol-1', 'us-east-1', 8, tags=[('Name', 'web01'), ('Owner', 'alice'), ('CostCentre', 'cc1')]),
+        volume('vol-2', 'us-east-1', 100, 'in-use', 'io1', tags=[('owner', 'Bob'), ('project', 'apollo')]),
+        volume('vol-3', 'us-east-1', 50),   # No Tags at all
+        volume('vol-4', 'us-east-1', 20, tags=[('oWnEr', 'alice')]),   # Key spelled in mixed case
+        volume('vol-5', 'us-east-1', 30, tags=[]),   # Empty tag list
+        volume('vol-6', 'us-east-1', 500, 'in-use', 'st1', tags=[('OWNER', 'Alice'), ('Project', 'gemini'), ('costcentre', 'cc2')]),
+    ],
+    'eu-west-1': [
+        volume('vol-9', 'eu-west-1', 30, tags=[('Name', 'db'), ('Project', 'apollo'), ('owner', 'alice')]),
+        volume('vol-10', 'eu-west-1', 8, 'in-use', tags=[('name', 'WEB02'), ('team', 'ops')]),
+    ],
+}
+
+# (filters, match)
+CASES = [
+    ({}, 'any'),
+    ({'name': ['WEB']}, 'any'),
+    ({'name_exact': ['web01']}, 'any'),
+    ({'owner': ['ALI']}, 'any'),
+    ({'owner_exact': ['alice']}, 'any'),
+    ({'owner_exact': ['Alice', 'Bob']}, 'any'),
+    ({'project_exact': ['apollo']}, 'any'),
+    ({'owner_exact': ['alice'], 'project_exact': ['apollo']}, 'any'),
+    ({'tag': ['cost']}, 'any'),
+    ({'tag_exact': ['CostCentre']}, 'any'),
+    ({'missing': ['owner']}, 'any'),
+    ({'missing': ['owner', 'name']}, 'any'),
+    ({'lower_than': 20}, 'any'),
+    ({'greater_than': 50}, 'any'),
+    ({'range_lower': 10, 'range_upper': 60}, 'any'),
+    ({'lower_than': 0}, 'any'),
+    ({'range_lower': 0, 'range_upper': 60}, 'any'),
+    ({'owner': ['ali'], 'greater_than': 90}, 'any'),
+    ({'status': ['available'], 'owner_exact': ['alice']}, 'any'),
+    ({'owner_exact': ['alice'], 'project_exact': ['apollo']}, 'all'),
+    ({'owner_exact': ['alice'], 'lower_than': 20}, 'all'),
+    ({'tag_exact': ['CostCentre'], 'owner': ['ali']}, 'all'),
+    ({'missing': ['project'], 'greater_than': 10}, 'all'),
+    ({'name': ['web'], 'range_lower': 1, 'range_upper': 10}, 'all'),
+]
+
+MODES = {
+    'pushdown': {},
+    'no-pushdown': {'no_pushdown': True},
+    'cache': {'cache': True},
+}
+
+def baseline_checks(data, filters):
+    # The per-filter checks of the original report, one result per filter in use
+    tags = data.get('Tags') or []
+    checks = []
+
+    def tag_values(key):
+        return [tag['Value'] for tag in tags if str.lower(tag['Key']) == key]
+
+    for key in ('name', 'owner', 'project'):
+        if filters.get(key):
+            checks.append(any(str.lower(arg) in str.lower(value) for value in tag_values(key) for arg in filters[key]))
+        if filters.get(key + '_exact'):
+            checks.append(any(arg == value for value in tag_values(key) for arg in filters[key + '_exact']))
+    if filters.get('tag'):
+        checks.append(any(str.lower(custom_tag) in str.lower(tag['Key']) for tag in tags for custom_tag in filters['tag']))
+    if filters.get('tag_exact'):
+        checks.append(any(custom_tag == tag['Key'] for tag in tags for custom_tag in filters['tag_exact']))
+    if filters.get('lower_than'):
+        checks.append(data['Size'] <= filters['lower_than'])
+    if filters.get('greater_than'):
+        checks.append(data['Size'] >= filters['greater_than'])
+    if filters.get('range_lower'):
+        checks.append(filters['range_lower'] <= data['Size'] <= filters['range_upper'])
+    if filters.get('missing'):
+        checks.append(bool(tags) and all(missing not in [str.lower(tag['Key']) for tag in tags] for missing in filters['missing']))
+    return checks
+
+def baseline_volumes(filters, match):
+    selected = set()
+    for region in REGIONS:
+        for data in FLEET[region]:
+            if filters.get('status') and data['State'] not in filters['status']:
+                continue
+            checks = baseline_checks(data, filters)
+            if not checks or (all(checks) if match == 'all' else any(checks)):
+                selected.add(data['VolumeId'])
+    return selected
+
+def fail(region, error):
+    raise error
+
+@pytest.fixture
+def session(stub_session):
+    return stub_session(FLEET)
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('filters, match', CASES)
+def test_filters_match_baseline(session, tmp_path, filters, match, mode):
+    settings = dict(MODES[mode], match=match, cache_dir=str(tmp_path))
+    found = [record.volume_id for record in iter_volumes(REGIONS, filters, session=session, on_error=fail, **settings)]
+    assert sorted(found) == sorted(baseline_volumes(filters, match))
+    assert len(found) == len(set(found))
+
+def test_pushdown_keeps_any_case_of_the_tag_key(session):
+    # Pushed down, --owner-exact must still return the volume whose key is spelled oWnEr
+    found = set(record.volume_id for record in iter_volumes(['us-east-1'], {'owner_exact': ['alice']}, session=session, on_error=fail))
+    assert found == {'vol-1', 'vol-4'}
+
+def test_missing_skips_untagged_volumes(session):
+    found = set(record.volume_id for record in iter_volumes(['us-east-1'], {'missing': ['owner']}, session=session, on_error=fail, no_pushdown=True))
+    assert 'vol-3' not in found and 'vol-5' not in found
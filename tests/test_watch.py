@@ -0,0 +1,99 @@
+# Watch mode against a stubbed DescribeVolumes : the silent baseline, added/removed/changed events, failing regions and the cheap checks
+import datetime
+
+import pytest
+
+from ec2_volume_report.options import build_options
+from ec2_volume_report.scan import Scanner
+from ec2_volume_report.watch import Watcher, changed_fields
+
+CREATED = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+def volume(vol, region, size=8, state='available', owner='alice', created=CREATED):
+    return {'VolumeId': vol, 'AvailabilityZone': region + 'a', 'Size': size, 'VolumeType': 'gp2', 'State': state, 'CreateTime': created,
+            'Attachments': [], 'Tags': [{'Key': 'Owner', 'Value': owner}]}
+
+@pytest.fixture
+def fleet():
+    return {
+        'us-east-1': [volume('vol-1', 'us-east-1'), volume('vol-2', 'us-east-1', 100)],
+        'eu-west-1': [volume('vol-9', 'eu-west-1', 30)],
+    }
+
+@pytest.fixture
+def calls():
+    return []
+
+@pytest.fixture
+def failing():
+    return set()
+
+@pytest.fixture
+def errors():
+    return []
+
+@pytest.fixture
+def watcher(stub_session, fleet, calls, failing, errors):
+    # reconcile=0 : every check is a full scan
+    scanner = Scanner(stub_session(fleet, calls, failing), region_timeout=30)
+    return Watcher([(scanner, 'us-east-1'), (scanner, 'eu-west-1')], build_options(), reconcile=0, on_error=lambda region, error: errors.append(region))
+
+def events(watcher):
+    return sorted((event, record.volume_id, changes) for event, record, changes in watcher.check())
+
+def test_first_scan_is_a_silent_baseline(watcher):
+    assert events(watcher) == []
+    assert events(watcher) == []
+
+def test_added_removed_and_changed(watcher, fleet):
+    events(watcher)
+    fleet['us-east-1'].append(volume('vol-3', 'us-east-1'))
+    fleet['us-east-1'] = [data for data in fleet['us-east-1'] if data['VolumeId'] != 'vol-2']
+    fleet['eu-west-1'][0] = volume('vol-9', 'eu-west-1', 30, state='in-use', owner='bob')
+    assert events(watcher) == [
+        ('added', 'vol-3', None),
+        ('changed', 'vol-9', {'Status': ('available', 'in-use'), 'Owner': ('alice', 'bob')}),
+        ('removed', 'vol-2', None),
+    ]
+    assert events(watcher) == []
+
+def test_changed_fields_covers_columns_of_one_side():
+    assert changed_fields({'Size': '8', 'CostCentre': 'cc1'}, {'Size': '10'}) == {'Size': ('8', '10'), 'CostCentre': ('cc1', '')}
+    assert changed_fields({'Size': '8'}, {'Size': '8'}) == {}
+
+def test_failed_region_keeps_its_snapshot(watcher, fleet, failing, errors):
+    events(watcher)
+    failing.add('eu-west-1')
+    fleet['us-east-1'].append(volume('vol-3', 'us-east-1'))
+    assert events(watcher) == [('added', 'vol-3', None)]   # No removal for the volumes of the failing region
+    assert errors == ['eu-west-1']
+    failing.clear()
+    fleet['eu-west-1'].append(volume('vol-10', 'eu-west-1'))
+    assert events(watcher) == [('added', 'vol-10', None)]   # vol-9 was kept, it is not reported added again
+
+def test_region_failing_from_the_start_is_baselined_later(watcher, fleet, failing):
+    failing.add('eu-west-1')
+    events(watcher)
+    failing.clear()
+    assert events(watcher) == []   # Its first complete scan is its silent baseline
+    fleet['eu-west-1'].append(volume('vol-10', 'eu-west-1'))
+    assert events(watcher) == [('added', 'vol-10', None)]
+
+def test_cheap_check_lists_new_volumes_only(watcher, fleet, calls):
+    events(watcher)
+    watcher.reconcile = 3600
+    calls.clear()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    fleet['us-east-1'] = [data for data in fleet['us-east-1'] if data['VolumeId'] != 'vol-2']
+    fleet['us-east-1'].append(volume('vol-3', 'us-east-1', created=now))
+    fleet['eu-west-1'][0] = volume('vol-9', 'eu-west-1', 30, owner='bob')
+    assert events(watcher) == [('added', 'vol-3', None)]   # Neither the removal of vol-2 nor the change of vol-9
+    assert calls
+    for region, params in calls:
+        create_time = [aws_filter for aws_filter in params.get('Filters', []) if aws_filter['Name'] == 'create-time']
+        assert create_time and now.strftime('%Y-%m-%dT%H') + '*' in create_time[0]['Values']
+    watcher.reconcile = 0
+    assert events(watcher) == [
+        ('changed', 'vol-9', {'Owner': ('alice', 'bob')}),
+        ('removed', 'vol-2', None),
+    ]